@@ -1,11 +1,14 @@
 import streamlit as st
 from streamlit_agraph import Node, Edge
-from components import StochasticGraph
+from components import StochasticGraph, profiling
 import json
 from os import listdir
 
 st.set_page_config(page_title="Graph Editor", page_icon="🧊",layout="wide")
 
+# above this many edges the downloads are prepared on request
+DOWNLOAD_MAX_EDGES = 100000
+
 
 
 
@@ -29,6 +32,19 @@ graph_editor_cols = st.columns([0.7,0.3])
 
 # Graph Editor
 physiscs_on = graph_editor_cols[1].toggle("Activar físicas", key="physics_on",value=True,help="Activa la simulación de físicas en la gráfica")
+debug_on = graph_editor_cols[1].toggle("Modo depuración", key="debug_on",value=profiling.PROFILER.enabled,
+                                       help="Mide el tiempo de cada cálculo y muestra un panel de rendimiento")
+if debug_on:
+    profiling.enable()
+else:
+    profiling.disable()
+
+with graph_editor_cols[1].popover("Nivel de detalle",help="Controla cuánto del grafo se dibuja en cadenas grandes",use_container_width=True):
+    max_nodes = st.number_input("Máximo de nodos visibles",key="max_nodes",min_value=10,max_value=2000,value=200,step=10,
+                                help="Por encima de este número se dibujan las clases de comunicación")
+    max_edges = st.number_input("Máximo de aristas visibles",key="max_edges",min_value=10,max_value=10000,value=1000,step=100)
+    threshold = st.slider("Umbral de probabilidad",key="edge_threshold",min_value=0.0,max_value=1.0,value=0.0,step=0.01,
+                          help="Oculta las aristas con probabilidad menor al umbral")
 
 with graph_editor_cols[1].popover("Añadir nodo",help="Añade un nodo al grafo",use_container_width=True):
 
@@ -54,15 +70,29 @@ with graph_editor_cols[1].popover("Añadir nodo",help="Añade un nodo al grafo",
             else:
                 st.error("El nodo ya existe")
 
+chain_kind = graph_editor_cols[1].radio("Tipo de cadena",["Tiempo discreto","Tiempo continuo"],
+                                        index=int(st.session_state.graph.is_continuous()),horizontal=True,
+                                        help="En tiempo continuo las etiquetas de las aristas son tasas de transición")
+st.session_state.graph.set_kind("continuous" if chain_kind == "Tiempo continuo" else "discrete")
+continuous = st.session_state.graph.is_continuous()
+# probabilities keep two decimals; rates can be any positive number
+edge_format = "%g" if continuous else "%0.2f"
+
 with graph_editor_cols[1].popover("Añadir arista",help="Añade una arista al grafo",use_container_width=True):
 
-    nameedege =  st.number_input("Peso de la arista",key="edge_weight",min_value=0.0,max_value=1.0,step=0.1,format="%.2f")
-    nodelist = [node.id for node in st.session_state.graph.get_nodes()]
+    if continuous:
+        nameedege =  st.number_input("Tasa de la arista",key="edge_rate",min_value=0.0,value=1.0,step=0.1,format="%g")
+    else:
+        nameedege =  st.number_input("Peso de la arista",key="edge_weight",min_value=0.0,max_value=1.0,step=0.1,format="%.2f")
+    nodelist = st.session_state.graph.node_ids()
     source = st.selectbox("Nodo origen", options=nodelist, key="edge_source")
     target = st.selectbox("Nodo destino", options=nodelist, key="edge_target")
     color = st.color_picker("Color de la arista", key="edge_color",value="#000000")
     if st.checkbox("Crear arista de regreso", key="edge_back"):
-        nameedege2 = st.number_input("Peso de la arista de regreso",key="edge_weight2",min_value=0.0,max_value=1.0,step=0.1,format="%.2f")
+        if continuous:
+            nameedege2 = st.number_input("Tasa de la arista de regreso",key="edge_rate2",min_value=0.0,value=1.0,step=0.1,format="%g")
+        else:
+            nameedege2 = st.number_input("Peso de la arista de regreso",key="edge_weight2",min_value=0.0,max_value=1.0,step=0.1,format="%.2f")
     else:
         nameedege2 = None
         
@@ -73,7 +103,7 @@ with graph_editor_cols[1].popover("Añadir arista",help="Añade una arista al gr
             if not st.session_state.graph.in_edges(source, target):
                 st.session_state.graph.add_edge(Edge(source=source,
                                                     target=target,
-                                                    label="%0.2f"%nameedege,
+                                                    label=edge_format%nameedege,
                                                     color=color,
                                                     smooth=True,
                                                     length=150,)
@@ -87,7 +117,7 @@ with graph_editor_cols[1].popover("Añadir arista",help="Añade una arista al gr
                 if not st.session_state.graph.in_edges(target, source):
                     st.session_state.graph.add_edge(Edge(source=target,
                                                         target=source,
-                                                        label="%0.2f"%nameedege2,
+                                                        label=edge_format%nameedege2,
                                                         color=color,
                                                         smooth=True,
                                                         length=150,)
@@ -100,11 +130,13 @@ with graph_editor_cols[1].popover("Limpiar grafo",help="Elimina todos los nodos
         st.session_state.graph = StochasticGraph()
 
 with graph_editor_cols[1].popover("Cargar Configuración",help="Carga la configuración de un grafo previamente guardado",use_container_width=True):
-    file = st.file_uploader("Selecciona un archivo JSON",type=["json"])
+    file = st.file_uploader("Selecciona un archivo JSON o NPZ",type=["json","npz"])
     if file is not None:
-        data = json.load(file)
         st.session_state.graph = StochasticGraph()
-        st.session_state.graph.load_json(data)
+        if file.name.endswith(".npz"):
+            st.session_state.graph.load_npz(file)
+        else:
+            st.session_state.graph.load_json(json.load(file))
         st.session_state.proyectname = file.name.split(".")[0]
 
 with graph_editor_cols[1].popover("Cargar Ejemplo",help="Carga un grafo de ejemplo",use_container_width=True):
@@ -129,12 +161,15 @@ else:
                                                     "directed":True,
                                                     "physics":physiscs_on,
                                                     "hierarchical":False
-                                                    }
+                                                    },
+                                                    max_nodes=max_nodes,
+                                                    max_edges=max_edges,
+                                                    threshold=threshold
                                                     )
             
         with tabs[1]:
 
-            st.graphviz_chart(st.session_state.graph.to_dot())
+            st.graphviz_chart(st.session_state.graph.get_view(max_nodes,max_edges,threshold).to_dot())
 
 
 configcols = st.columns(3)
@@ -148,8 +183,22 @@ if configcols[1].button("Calculadora de Expresiones",disabled=st.session_state.g
 if configcols[2].button("Simulación de Markov",disabled=st.session_state.graph.is_empty(),use_container_width=True):
     st.session_state.graph.render_simulation()
 
-graph_editor_cols[1].download_button("Descargar configuración",
-                   data=json.dumps(st.session_state.graph.get_json()),
-                   file_name=str(st.session_state.proyectname+".json"),
-                   mime="application/json")
-
+# both payloads are memoized on the graph version; big graphs are only
+# serialized when asked for, so editing them doesn't pay for it every rerun
+if st.session_state.graph.number_of_edges() <= DOWNLOAD_MAX_EDGES or \
+        graph_editor_cols[1].button("Preparar descargas",use_container_width=True):
+    graph_editor_cols[1].download_button("Descargar configuración",
+                       data=st.session_state.graph.get_json_payload(),
+                       file_name=str(st.session_state.proyectname+".json"),
+                       mime="application/json")
+
+    graph_editor_cols[1].download_button("Descargar binario (.npz)",
+                       data=st.session_state.graph.get_npz_payload(),
+                       file_name=str(st.session_state.proyectname+".npz"),
+                       mime="application/octet-stream",
+                       help="Formato compacto para cadenas grandes")
+
+if debug_on:
+    with st.expander("Perfil de rendimiento",expanded=True):
+        from components.rendering import render_profile
+        render_profile()
@@ -0,0 +1,79 @@
+"""Synthetic chains in the same Node/Edge JSON format as ``examples/``."""
+import numpy as np
+
+
+def _node(name):
+    return {"id": name, "title": name, "label": name, "shape": "circle", "size": 25, "color": "#7BE141"}
+
+
+def _edge(source, target, probability):
+    return {"source": source, "from": source, "to": target, "color": "#000000",
+            "label": repr(float(probability)), "smooth": True, "length": 150}
+
+
+def _chain(names, rows, cols, probabilities):
+    return {
+        "nodes": [_node(name) for name in names],
+        "edges": [_edge(names[i], names[j], p) for i, j, p in zip(rows.tolist(), cols.tolist(), probabilities.tolist())],
+    }
+
+
+def random_walk(n, degree=4, seed=0):
+    """Each state jumps to its ring neighbour and ``degree - 1`` random states."""
+    rng = np.random.default_rng(seed)
+    names = [f"s{i}" for i in range(n)]
+    degree = min(degree, n)
+    rows = np.repeat(np.arange(n), degree)
+    cols = rng.integers(0, n, size=n * degree)
+    cols[::degree] = (np.arange(n) + 1) % n  # keeps the chain irreducible
+    _, first = np.unique(rows * n + cols, return_index=True)
+    rows, cols = rows[np.sort(first)], cols[np.sort(first)]
+    weights = rng.random(len(rows)) + 0.05
+    weights /= np.bincount(rows, weights=weights, minlength=n)[rows]
+    return _chain(names, rows, cols, weights)
+
+
+def dense_chain(n, density=1.0, seed=0):
+    """Every entry is non-zero with probability ``density`` (diagonal always)."""
+    rng = np.random.default_rng(seed)
+    names = [f"s{i}" for i in range(n)]
+    mask = rng.random((n, n)) < density
+    np.fill_diagonal(mask, True)
+    rows, cols = np.nonzero(mask)
+    weights = rng.random(len(rows)) + 0.05
+    weights /= np.bincount(rows, weights=weights, minlength=n)[rows]
+    return _chain(names, rows, cols, weights)
+
+
+def birth_death(n, p=0.4, q=0.4):
+    """Birth-death chain on ``0..n-1`` with reflecting boundaries."""
+    names = [str(i) for i in range(n)]
+    rows, cols, probabilities = [], [], []
+    for i in range(n):
+        up = p if i < n - 1 else 0.0
+        down = q if i > 0 else 0.0
+        for j, probability in ((i + 1, up), (i - 1, down), (i, 1.0 - up - down)):
+            if probability > 0:
+                rows.append(i)
+                cols.append(j)
+                probabilities.append(probability)
+    return _chain(names, np.array(rows), np.array(cols), np.array(probabilities))
+
+
+def gamblers_ruin(n, p=0.4):
+    """Gambler's ruin with absorbing barriers at ``0`` and ``n - 1``."""
+    names = [f"{i}$" for i in range(n)]
+    rows, cols, probabilities = [0, n - 1], [0, n - 1], [1.0, 1.0]
+    for i in range(1, n - 1):
+        rows += [i, i]
+        cols += [i + 1, i - 1]
+        probabilities += [p, 1.0 - p]
+    return _chain(names, np.array(rows), np.array(cols), np.array(probabilities))
+
+
+GENERATORS = {
+    "random_walk": random_walk,
+    "dense": dense_chain,
+    "birth_death": birth_death,
+    "gamblers_ruin": gamblers_ruin,
+}
@@ -0,0 +1,60 @@
+"""Cumulative-sum vs alias sampler as the number of states grows.
+
+Run from the repository root::
+
+    python -m benchmarks.samplers --sizes 10 100 1000 2000 --paths 10000 --steps 50
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from components.sampling import SAMPLERS, simulate_paths
+
+
+def wide_random_walk(n, rng):
+    # every state can jump anywhere, which is the worst case for the
+    # cumulative sampler since each row holds n entries
+    matrix = rng.random((n, n))
+    return matrix / matrix.sum(axis=1, keepdims=True)
+
+
+def bench(n, paths, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = wide_random_walk(n, rng)
+    initial = rng.integers(0, n, size=paths)
+    row = {"states": n, "paths": paths, "steps": steps}
+    for name, sampler_cls in SAMPLERS.items():
+        start = time.perf_counter()
+        sampler = sampler_cls.from_matrix(matrix)
+        built = time.perf_counter()
+        simulate_paths(sampler, initial, steps, paths=paths, rng=seed)
+        done = time.perf_counter()
+        row[f"{name}_build_s"] = built - start
+        row[f"{name}_simulate_s"] = done - built
+        row[f"{name}_ns_per_step"] = 1e9 * (done - built) / (paths * steps)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000, 2000])
+    parser.add_argument("--paths", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per size")
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print(f"{'states':>8} {'cumsum ns/step':>15} {'alias ns/step':>14} {'alias build s':>14}")
+    for n in args.sizes:
+        row = bench(n, args.paths, args.steps)
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(f"{n:>8} {row['cumulative_ns_per_step']:>15.1f} "
+                  f"{row['alias_ns_per_step']:>14.1f} {row['alias_build_s']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
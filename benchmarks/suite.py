@@ -0,0 +1,141 @@
+"""Headless benchmark suite for the StochasticGraph hot paths.
+
+Run from the repository root::
+
+    python -m benchmarks.suite --sizes 10 100 1000 10000 100000 --output bench.json
+
+Every method is timed cold on a freshly loaded graph (so memoized matrices
+are rebuilt) and once more warm, right after, to show what the cache saves.
+Every method runs once on a small chain before the timings start, so lazy
+imports of pandas and SciPy aren't counted as cold time.
+Methods that materialize a dense n x n matrix are skipped above
+``--max-dense`` states.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from components import StochasticGraph
+from components.matrix import SPARSE_MIN_STATES
+
+from .generators import GENERATORS
+
+# name -> (callable, needs a dense n x n matrix)
+METHODS = {
+    "load_json": (lambda graph, data: graph.load_json(data), False),
+    "get_json": (lambda graph, data: graph.get_json(), False),
+    "get_adjacency": (lambda graph, data: graph.get_adjacency(), False),
+    "to_dot": (lambda graph, data: graph.to_dot(), False),
+    "get_view": (lambda graph, data: graph.get_view(), False),
+    "get_transition_matrix_df": (lambda graph, data: graph.get_transition_matrix_df(), True),
+    "classify": (lambda graph, data: graph.classify(), False),
+    "is_regular_chain": (lambda graph, data: graph.is_regular_chain(), False),
+    "is_absorbing_chain": (lambda graph, data: graph.is_absorbing_chain(), False),
+    "stationary_distribution": (lambda graph, data: graph.stationary_distribution(), False),
+    "n_step_distribution": (lambda graph, data: graph.n_step_distribution(graph.get_states()[0], range(101)), False),
+    "expected_hitting_times": (lambda graph, data: graph.expected_hitting_times(graph.get_states()[:1]), False),
+    "simulate": (lambda graph, data: graph.simulate(graph.get_states()[0], 1000, seed=0), False),
+    "simulate_batch": (lambda graph, data: graph.simulate_batch(graph.get_states()[0], 1000, paths=100, seed=0), False),
+    "simulate_alias": (lambda graph, data: graph.simulate_batch(graph.get_states()[0], 1000, paths=100, seed=0,
+                                                                sampler="alias"), False),
+}
+
+
+def warm_up(methods):
+    """Run every method once on a small sparse chain, before anything is timed.
+
+    The components import pandas and SciPy lazily, so otherwise the first
+    cold run of a session pays for those imports.
+    """
+    data = GENERATORS["random_walk"](SPARSE_MIN_STATES * 2, degree=4)
+    for name in methods:
+        METHODS[name][0](StochasticGraph() if name == "load_json" else _loaded(data), data)
+
+
+def _loaded(data):
+    graph = StochasticGraph()
+    graph.load_json(data)
+    return graph
+
+
+def time_method(name, data, repeat):
+    method, _ = METHODS[name]
+    cold = []
+    for _ in range(repeat):
+        graph = StochasticGraph() if name == "load_json" else _loaded(data)
+        start = time.perf_counter()
+        method(graph, data)
+        cold.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    method(graph, data)
+    warm = time.perf_counter() - start
+    return {"cold_s": cold, "best_s": min(cold), "warm_s": warm}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(generators, sizes, methods, repeat=3, max_dense=5000, degree=4, density=0.1):
+    warm_up(methods)
+    results = []
+    for generator in generators:
+        for n in sizes:
+            if generator == "random_walk":
+                data = GENERATORS[generator](n, degree=degree)
+            elif generator == "dense":
+                data = GENERATORS[generator](n, density=density)
+            else:
+                data = GENERATORS[generator](n)
+            for name in methods:
+                row = {"generator": generator, "states": n, "edges": len(data["edges"]), "method": name}
+                if METHODS[name][1] and n > max_dense:
+                    row["skipped"] = "dense"
+                else:
+                    row.update(time_method(name, data, repeat))
+                results.append(row)
+                print(json.dumps(row), file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generators", nargs="+", choices=sorted(GENERATORS), default=["random_walk", "birth_death", "gamblers_ruin"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--methods", nargs="+", choices=sorted(METHODS), default=list(METHODS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-dense", type=int, default=5000)
+    parser.add_argument("--degree", type=int, default=4, help="outgoing edges per state for random_walk")
+    parser.add_argument("--density", type=float, default=0.1, help="fill ratio for dense")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": run(args.generators, args.sizes, args.methods, repeat=args.repeat,
+                       max_dense=args.max_dense, degree=args.degree, density=args.density),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
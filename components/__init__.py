@@ -1,5 +1,7 @@
 from __future__ import annotations
+from .chain import MarkovChain
+from .ctmc import ContinuousChain
 from .graph import Graph
 from .stochastic_graph import StochasticGraph
 
-__all__ = ["Graph", "StochasticGraph"]
+__all__ = ["ContinuousChain", "Graph", "MarkovChain", "StochasticGraph"]
@@ -0,0 +1,102 @@
+import numpy as np
+
+from .matrix import SparseTransitionMatrix
+
+
+class AbsorbingChain:
+    """Canonical form ``[[Q, R], [0, I]]`` of an absorbing chain.
+
+    Transient states come first, absorbing states last. ``I - Q`` is
+    factorized once (dense LU or sparse SuperLU); the fundamental matrix
+    ``N = (I - Q)^-1`` is never inverted, every query is a back-substitution
+    against the cached factorization.
+    """
+
+    def __init__(self, matrix, classification):
+        if not classification.is_absorbing:
+            raise ValueError("The chain is not absorbing")
+
+        self.transient = classification.transient_states
+        self.absorbing = classification.absorbing_states
+        self.order = np.concatenate([self.transient, self.absorbing])
+        self.sparse = isinstance(matrix, SparseTransitionMatrix)
+
+        if self.sparse:
+            self.Q, self.R = self._sparse_blocks(matrix)
+        else:
+            matrix = np.asarray(matrix, dtype="float64")
+            self.Q = matrix[np.ix_(self.transient, self.transient)]
+            self.R = matrix[np.ix_(self.transient, self.absorbing)]
+        self._factor = None
+        self._steps = None
+
+    def _sparse_blocks(self, matrix):
+        from scipy import sparse
+
+        position = np.full(matrix.n_states, -1, dtype=np.int64)
+        position[self.transient] = np.arange(len(self.transient))
+        absorbing = np.full(matrix.n_states, -1, dtype=np.int64)
+        absorbing[self.absorbing] = np.arange(len(self.absorbing))
+
+        rows = position[matrix.rows]
+        from_transient = rows >= 0
+        to_transient = from_transient & (position[matrix.indices] >= 0)
+        to_absorbing = from_transient & (absorbing[matrix.indices] >= 0)
+        shape_q = (len(self.transient), len(self.transient))
+        shape_r = (len(self.transient), len(self.absorbing))
+        Q = sparse.csc_matrix((matrix.data[to_transient], (rows[to_transient], position[matrix.indices[to_transient]])), shape=shape_q)
+        R = sparse.csr_matrix((matrix.data[to_absorbing], (rows[to_absorbing], absorbing[matrix.indices[to_absorbing]])), shape=shape_r)
+        return Q, R
+
+    @property
+    def factorization(self):
+        if self._factor is None:
+            n = len(self.transient)
+            if self.sparse:
+                from scipy import sparse
+                from scipy.sparse import linalg
+
+                self._factor = linalg.splu((sparse.identity(n, format="csc") - self.Q).tocsc())
+            else:
+                from scipy import linalg
+
+                self._factor = linalg.lu_factor(np.eye(n) - self.Q)
+        return self._factor
+
+    def solve(self, rhs, transpose=False):
+        """Solve ``(I - Q) x = rhs`` (or the transposed system) by back-substitution."""
+        if len(self.transient) == 0:
+            return np.zeros(np.shape(rhs))
+        if self.sparse:
+            return self.factorization.solve(np.asarray(rhs, dtype="float64"), trans="T" if transpose else "N")
+        from scipy import linalg
+
+        return linalg.lu_solve(self.factorization, rhs, trans=1 if transpose else 0)
+
+    def _unit(self, start):
+        # start is a transient position, i.e. an index into self.transient
+        e = np.zeros(len(self.transient))
+        e[start] = 1.0
+        return e
+
+    def expected_steps(self):
+        """Expected number of steps to absorption from every transient state, ``N 1``."""
+        if self._steps is None:
+            self._steps = self.solve(np.ones(len(self.transient)))
+        return self._steps
+
+    def expected_visits(self, start):
+        """Row ``start`` of ``N``: expected visits to each transient state."""
+        return self.solve(self._unit(start), transpose=True)
+
+    def absorption_probabilities(self, start=None):
+        """``B = N R``, or only its row for transient position ``start``."""
+        if start is not None:
+            visits = self.expected_visits(start)
+            return np.asarray(self.R.T @ visits).ravel()
+        R = self.R.toarray() if self.sparse else self.R
+        return np.asarray(self.solve(R)).reshape(len(self.transient), len(self.absorbing))
+
+    def fundamental_matrix(self):
+        """Explicit ``N``, built column by column from the factorization; small chains only."""
+        return self.solve(np.eye(len(self.transient)))
@@ -0,0 +1,210 @@
+from dataclasses import replace
+
+import numpy as np
+
+from .absorbing import AbsorbingChain
+from .classification import classify_chain
+from .matrix import SparseTransitionMatrix, use_sparse
+from .montecarlo import monte_carlo
+from .profiling import PROFILER, profiled
+from .sampling import make_sampler, simulate_paths
+from .stationary import stationary_distribution
+from .streaming import BLOCK_SIZE, OnlineStatistics, iter_states
+from .transient import expected_hitting_times, first_passage, matrix_power, propagate
+
+
+class MarkovChain:
+    """Headless Markov chain: state labels plus a CSR transition matrix.
+
+    This is the computation core behind :class:`StochasticGraph`; it only
+    needs NumPy (SciPy is imported lazily by the solvers that use it), so
+    batch jobs and worker processes can use it without Streamlit, pandas or
+    SymPy. States are addressed by integer index; ``index`` maps labels to
+    indices. A chain is immutable, so everything derived from it is memoized.
+    """
+
+    def __init__(self, states, matrix):
+        self.states = list(states)
+        self.index = {state: i for i, state in enumerate(self.states)}
+        self.matrix = matrix
+        self._cache = {}
+        # stationary vectors of the chain this one was patched from
+        self._warm_start = None
+
+    @classmethod
+    @profiled
+    def from_edges(cls, states, sources, targets, probabilities):
+        """Build a chain from parallel sequences of edge labels and probabilities."""
+        states = list(states)
+        index = {state: i for i, state in enumerate(states)}
+        rows = np.fromiter((index[source] for source in sources), dtype=np.int64)
+        cols = np.fromiter((index[target] for target in targets), dtype=np.int64)
+        data = np.fromiter(probabilities, dtype="float64")
+        return cls(states, SparseTransitionMatrix.from_coo(len(states), rows, cols, data))
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a chain straight from the ``get_json`` format, without Node/Edge objects."""
+        states = [node["id"] for node in data["nodes"]]
+        seen = set(states)
+        for edge in data["edges"]:
+            for state in (edge["source"], edge["to"]):
+                if state not in seen:
+                    seen.add(state)
+                    states.append(state)
+        edges = data["edges"]
+        return cls.from_edges(states, (edge["source"] for edge in edges), (edge["to"] for edge in edges),
+                              (float(edge["label"]) for edge in edges))
+
+    @profiled
+    def with_rows(self, changes, tol=1e-9):
+        """Chain with single entries replaced, as ``{row: {col: probability or None}}``.
+
+        ``None`` removes the entry. Only the changed rows are rebuilt: the
+        dense matrix is patched on a copy, the classification is
+        kept when no positive entry appears or disappears (it only depends
+        on the support), and the last stationary vectors warm-start the
+        next solve.
+        """
+        matrix = self.matrix
+        rows = sorted(changes)
+        values = []
+        support_changed = False
+        for row in rows:
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            entries = dict(zip(matrix.indices[start:end].tolist(), matrix.data[start:end].tolist()))
+            support = {col for col, probability in entries.items() if probability > 0}
+            for col, probability in changes[row].items():
+                if probability is None:
+                    entries.pop(col, None)
+                else:
+                    entries[col] = probability
+            cols = sorted(entries)
+            values.append((cols, [entries[col] for col in cols]))
+            support_changed |= support != {col for col in cols if entries[col] > 0}
+
+        chain = MarkovChain(self.states, matrix.replace_rows(rows, values))
+        if "dense" in self._cache:
+            dense = self._cache["dense"].copy()
+            for row, (cols, data) in zip(rows, values):
+                dense[row] = 0.0
+                dense[row, cols] = data
+            dense.setflags(write=False)
+            chain._cache["dense"] = dense
+        if not support_changed and "classification" in self._cache:
+            classification = self._cache["classification"]
+            valid = all(abs(sum(data) - 1.0) <= tol for _, data in values)
+            if not (classification.is_stochastic and valid):
+                valid = bool(np.all(np.abs(chain.matrix.row_sums() - 1.0) <= tol))
+            chain._cache["classification"] = replace(classification, is_stochastic=valid)
+        chain._warm_start = self._last_stationary()
+        return chain
+
+    def _last_stationary(self):
+        results = [value for key, value in self._cache.items() if isinstance(key, tuple) and key[0] == "stationary"]
+        if not results:
+            return self._warm_start
+        result = results[-1]
+        x0 = np.zeros(self.n_states)
+        for states, vector in zip(result.classes, result.vectors):
+            x0[states] = vector
+        return x0
+
+    def _cached(self, key, build):
+        if PROFILER.enabled:
+            PROFILER.cache("MarkovChain." + str(key[0] if isinstance(key, tuple) else key), key in self._cache)
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+    def is_sparse(self):
+        return use_sparse(self.n_states, self.matrix.nnz)
+
+    @profiled
+    def dense(self):
+        def build():
+            matrix = self.matrix.to_dense()
+            # shared by every caller through the cache
+            matrix.setflags(write=False)
+            return matrix
+        return self._cached("dense", build)
+
+    def analysis_matrix(self):
+        # engine code paths take either backend; large sparse chains never densify
+        return self.matrix if self.is_sparse() else self.dense()
+
+    @profiled
+    def sampler(self, sampler="cumulative"):
+        return self._cached(("sampler", sampler), lambda: make_sampler(self.matrix, sampler))
+
+    def reachable(self, state):
+        return np.flatnonzero(self.matrix.reachable([state]))
+
+    @profiled
+    def classify(self):
+        return self._cached("classification", lambda: classify_chain(self.matrix))
+
+    @profiled
+    def stationary_distribution(self, method="auto", tol=1e-12, max_iter=100000):
+        return self._cached(("stationary", method, tol, max_iter),
+                            lambda: stationary_distribution(self.analysis_matrix(), self.classify(),
+                                                            method=method, tol=tol, max_iter=max_iter,
+                                                            x0=self._warm_start))
+
+    def distribution(self, initial):
+        """Probability vector for a state index or an explicit distribution."""
+        if np.ndim(initial) == 0:
+            x0 = np.zeros(self.n_states)
+            x0[int(initial)] = 1.0
+            return x0
+        return np.asarray(initial, dtype="float64")
+
+    @profiled
+    def n_step(self, initial, horizons):
+        """Rows of ``P(X_t = j)`` for every ``t`` in ``horizons``, in one propagation pass."""
+        return propagate(self.analysis_matrix(), self.distribution(initial), horizons)
+
+    @profiled
+    def transition_power(self, n):
+        def build():
+            matrix = matrix_power(self.dense(), n)
+            matrix.setflags(write=False)
+            return matrix
+        return self._cached(("power", int(n)), build)
+
+    @profiled
+    def first_passage(self, initial, targets, horizon, include_start=False):
+        return first_passage(self.analysis_matrix(), self.distribution(initial), targets, horizon,
+                             include_start=include_start)
+
+    @profiled
+    def expected_hitting_times(self, targets):
+        targets = tuple(sorted(int(target) for target in targets))
+        return self._cached(("hitting", targets), lambda: expected_hitting_times(self.matrix, targets))
+
+    @profiled
+    def absorbing(self):
+        return self._cached("absorbing", lambda: AbsorbingChain(self.analysis_matrix(), self.classify()))
+
+    @profiled
+    def simulate(self, initial, steps, paths=1, seed=None, sampler="cumulative"):
+        return simulate_paths(self.sampler(sampler), initial, steps, paths=paths, rng=seed)
+
+    def stream(self, initial, steps, seed=None, sampler="cumulative", block_size=BLOCK_SIZE):
+        return iter_states(self.sampler(sampler), initial, steps, block_size=block_size, rng=seed)
+
+    @profiled
+    def statistics(self, initial, steps, seed=None, sampler="cumulative", block_size=BLOCK_SIZE):
+        statistics = OnlineStatistics(self.sampler(sampler), stationary=self.stationary_distribution().distribution)
+        for block in self.stream(initial, steps, seed=seed, sampler=sampler, block_size=block_size):
+            statistics.update(block)
+        return statistics
+
+    @profiled
+    def monte_carlo(self, initial, steps, paths, seed=None, targets=None, workers=None, sampler="cumulative"):
+        return monte_carlo(self.sampler(sampler), initial, steps, paths,
+                           seed=seed, targets=targets, workers=workers)
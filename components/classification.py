@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .sampling import row_support
+
+
+@dataclass(frozen=True)
+class ChainClassification:
+    """Communicating classes of a chain and the properties derived from them.
+
+    ``classes[k]`` holds the state indices of class ``k`` and ``class_of[i]``
+    is the class of state ``i``. ``periods[k]`` is 0 for a class whose
+    states can never return to themselves.
+    """
+
+    classes: list
+    class_of: np.ndarray
+    closed: np.ndarray
+    periods: np.ndarray
+    absorbing_states: np.ndarray
+    is_stochastic: bool
+
+    @property
+    def n_classes(self):
+        return len(self.classes)
+
+    @property
+    def recurrent_states(self):
+        return np.flatnonzero(self.closed[self.class_of])
+
+    @property
+    def transient_states(self):
+        return np.flatnonzero(~self.closed[self.class_of])
+
+    @property
+    def closed_classes(self):
+        return [c for c, closed in zip(self.classes, self.closed) if closed]
+
+    @property
+    def is_irreducible(self):
+        return self.n_classes == 1
+
+    @property
+    def is_aperiodic(self):
+        # states that can never return have no period and don't count
+        return bool(np.all(self.periods[self.periods > 0] == 1))
+
+    @property
+    def is_regular(self):
+        # a finite chain has a strictly positive power iff it is irreducible and aperiodic
+        return self.is_irreducible and self.is_aperiodic
+
+    @property
+    def is_ergodic(self):
+        return self.is_irreducible and self.is_aperiodic
+
+    @property
+    def is_absorbing(self):
+        # every closed class is a single absorbing state, so all states reach one
+        return len(self.absorbing_states) > 0 and len(self.absorbing_states) == int(self.closed.sum())
+
+
+def strongly_connected_components(indptr, indices):
+    """Tarjan's algorithm over a CSR adjacency, iterative to avoid recursion limits.
+
+    Returns ``(n_components, component_of)``; components come out in reverse
+    topological order.
+    """
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    n = len(indptr) - 1
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    component = [-1] * n
+    stack = []
+    counter = 0
+    n_components = 0
+
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, indptr[root]]]
+        while work:
+            frame = work[-1]
+            v = frame[0]
+            if frame[1] < indptr[v + 1]:
+                w = indices[frame[1]]
+                frame[1] += 1
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, indptr[w]])
+                elif on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+                continue
+
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == order[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component[w] = n_components
+                    if w == v:
+                        break
+                n_components += 1
+
+    return n_components, np.asarray(component, dtype=np.int64)
+
+
+def _class_periods(indptr, indices, rows, class_of, n_classes):
+    # BFS levels inside each class; the period is the gcd of
+    # level[u] + 1 - level[v] over the class's internal edges
+    indptr = indptr.tolist()
+    indices_list = indices.tolist()
+    class_list = class_of.tolist()
+    level = [-1] * len(class_list)
+    for root in range(len(class_list)):
+        if level[root] != -1:
+            continue
+        level[root] = 0
+        queue = [root]
+        for v in queue:
+            for slot in range(indptr[v], indptr[v + 1]):
+                w = indices_list[slot]
+                if level[w] == -1 and class_list[w] == class_list[v]:
+                    level[w] = level[v] + 1
+                    queue.append(w)
+
+    level = np.asarray(level, dtype=np.int64)
+    internal = class_of[rows] == class_of[indices]
+    source_class = class_of[rows[internal]]
+    gaps = np.abs(level[rows[internal]] + 1 - level[indices[internal]])
+
+    periods = np.zeros(n_classes, dtype=np.int64)
+    if len(gaps) > 0:
+        order = np.argsort(source_class, kind="stable")
+        source_class, gaps = source_class[order], gaps[order]
+        starts = np.flatnonzero(np.r_[True, source_class[1:] != source_class[:-1]])
+        periods[source_class[starts]] = np.gcd.reduceat(gaps, starts)
+    return periods
+
+
+def classify_chain(matrix, tol=1e-9):
+    """Classify a chain from its dense or sparse transition matrix in O(V + E).
+
+    Only the support of the matrix is used. Rows with no outgoing
+    probability are treated as absorbing, like the samplers do.
+    """
+    if hasattr(matrix, "row_sums"):
+        row_sums = matrix.row_sums()
+    else:
+        row_sums = np.asarray(matrix, dtype="float64").sum(axis=1)
+    indptr, indices, _ = row_support(matrix)
+    indices = indices.astype(np.int64)
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+    n_classes, class_of = strongly_connected_components(indptr, indices)
+    closed = np.ones(n_classes, dtype=bool)
+    closed[class_of[rows[class_of[rows] != class_of[indices]]]] = False
+
+    sizes = np.bincount(class_of, minlength=n_classes)
+    absorbing = np.flatnonzero(closed[class_of] & (sizes[class_of] == 1))
+
+    order = np.argsort(class_of, kind="stable")
+    classes = np.split(order, np.cumsum(sizes)[:-1])
+
+    return ChainClassification(
+        classes=classes,
+        class_of=class_of,
+        closed=closed,
+        periods=_class_periods(indptr, indices, rows, class_of, n_classes),
+        absorbing_states=absorbing,
+        is_stochastic=bool(np.all(np.abs(row_sums - 1.0) <= tol)),
+    )
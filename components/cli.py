@@ -0,0 +1,256 @@
+"""Headless batch analysis of chain files.
+
+Run from the repository root::
+
+    python -m components examples/
+    python -m components examples/*.json --analyses classify stationary absorbing
+    python -m components big.npz --analyses simulate --steps 100 1000 --paths 100000 --seeds 0 1 2
+
+Every argument is a chain saved by the app (``.json`` or ``.npz``) or a
+directory, of which every such file is taken. Each analysis of each file,
+and each point of the simulation sweep (``--steps`` x ``--paths`` x
+``--seeds``, with ``--horizon`` time units in place of ``--steps`` for
+continuous-time chains), is one job for a process pool; results are
+written as JSON Lines, one object per job, as soon as they are ready. A
+file that fails to load or analyse yields an ``error`` record and a
+non-zero exit status instead of stopping the batch.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .stochastic_graph import StochasticGraph
+
+ANALYSES = ("classify", "stationary", "absorbing", "simulate")
+SUFFIXES = (".json", ".npz")
+
+
+def chain_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(child for child in path.iterdir() if child.suffix in SUFFIXES))
+        else:
+            files.append(path)
+    return [str(file) for file in files]
+
+
+@lru_cache(maxsize=8)
+def load_graph(file):
+    # a worker usually gets several jobs of the same file; load it once
+    graph = StochasticGraph()
+    if file.endswith(".npz"):
+        graph.load_npz(file)
+    else:
+        with open(file) as f:
+            graph.load_json(json.load(f))
+    return graph
+
+
+def _by_state(states, values):
+    return {states[i]: float(values[i]) for i in np.flatnonzero(values)}
+
+
+def classify(graph, options):
+    classification = graph.classify()
+    states = graph.get_states()
+    return {
+        "states": len(states),
+        "edges": graph.number_of_edges(),
+        "is_stochastic": graph.is_stochastic(),
+        "invalid_rows": graph.get_invalid_rows(),
+        "classes": [[states[i] for i in members] for members in classification.classes],
+        "closed": classification.closed.tolist(),
+        "periods": classification.periods.tolist(),
+        "is_irreducible": classification.is_irreducible,
+        "is_aperiodic": classification.is_aperiodic,
+        "is_regular": classification.is_regular,
+        "is_ergodic": classification.is_ergodic,
+        "is_absorbing": classification.is_absorbing,
+        "absorbing_states": [states[i] for i in classification.absorbing_states],
+    }
+
+
+def stationary(graph, options):
+    result = graph.stationary_distribution(method=options["method"])
+    states = graph.get_states()
+    return {
+        "method": result.method,
+        "solvers": result.solvers,
+        "iterations": result.iterations,
+        "residual": float(result.residual),
+        "converged": result.converged,
+        "distributions": [_by_state(states, result.full(k)) for k in range(len(result.classes))],
+    }
+
+
+def absorbing(graph, options):
+    if not graph.is_absorbing_chain():
+        return {"is_absorbing": False}
+    analysis = graph.get_absorbing_analysis()
+    states = graph.get_states()
+    transient = [states[i] for i in analysis.transient]
+    absorbing_states = [states[i] for i in analysis.absorbing]
+    probabilities = analysis.absorption_probabilities()
+    if graph.is_continuous():
+        # the analysis runs on the uniformized chain, whose steps last 1 / Λ on average
+        expected = {"expected_time": dict(zip(transient, graph.get_continuous_chain().expected_time_to_absorption().tolist()))}
+    else:
+        expected = {"expected_steps": dict(zip(transient, analysis.expected_steps().tolist()))}
+    return {
+        "is_absorbing": True,
+        **expected,
+        "absorption_probabilities": {state: dict(zip(absorbing_states, row.tolist()))
+                                     for state, row in zip(transient, probabilities)},
+    }
+
+
+def _index(chain, state):
+    if state not in chain.index:
+        raise ValueError(f"unknown state {state!r}")
+    return chain.index[state]
+
+
+def simulate(graph, options):
+    if graph.is_continuous():
+        return simulate_continuous(graph, options)
+    chain = graph.get_chain()
+    initial = options["initial"] if options["initial"] is not None else chain.states[0]
+    targets = options["targets"]
+    result = chain.monte_carlo(_index(chain, initial), options["steps"], options["paths"], seed=options["seed"],
+                               targets=None if targets is None else [_index(chain, state) for state in targets],
+                               workers=1, sampler=options["sampler"])
+    record = {
+        "initial": initial,
+        "final": _by_state(chain.states, result.final / result.paths),
+        "occupancy": _by_state(chain.states, result.occupancy_distribution),
+    }
+    if targets is not None:
+        mean, half_width = result.mean_first_passage()
+        record.update(hits=result.hits, mean_first_passage=mean, ci_half_width=half_width)
+    return record
+
+
+def simulate_continuous(graph, options):
+    chain = graph.get_continuous_chain()
+    initial = options["initial"] if options["initial"] is not None else chain.states[0]
+    result = chain.simulate(_index(chain, initial), options["horizon"], options["paths"], seed=options["seed"],
+                            sampler=options["sampler"])
+    return {
+        "initial": initial,
+        "jumps": result.jumps,
+        "final": _by_state(chain.states, result.final_distribution),
+        "occupancy": _by_state(chain.states, result.occupancy_distribution),
+    }
+
+
+RUNNERS = {"classify": classify, "stationary": stationary, "absorbing": absorbing, "simulate": simulate}
+
+
+def run_job(job):
+    """Result record of one job, or None for a point of the sweep that doesn't apply to the file."""
+    file, analysis, options = job
+    record = {"file": file, "analysis": analysis}
+    start = time.perf_counter()
+    try:
+        graph = load_graph(file)
+        if analysis == "simulate":
+            # the kind is only known once the file is loaded here, in the worker:
+            # continuous chains take the length-th --horizon, the others --steps
+            length = "horizon" if graph.is_continuous() else "steps"
+            if options["length"] >= len(options[length]):
+                return None
+            options = {**options, length: options[length][options["length"]]}
+            record.update({length: options[length]}, paths=options["paths"], seed=options["seed"],
+                          sampler=options["sampler"])
+        record.update(RUNNERS[analysis](graph, options))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = time.perf_counter() - start
+    return record
+
+
+def jobs(files, analyses, options):
+    lengths = range(max(len(options["steps"]), len(options["horizon"])))
+    for file in files:
+        for analysis in analyses:
+            if analysis != "simulate":
+                yield file, analysis, options
+                continue
+            for length, paths, seed in itertools.product(lengths, options["paths"], options["seeds"]):
+                yield file, analysis, {**options, "length": length, "paths": paths, "seed": seed}
+
+
+def run(files, analyses, options, workers=None):
+    """Yield one result record per applicable job, in completion order when ``workers > 1``."""
+    tasks = list(jobs(files, analyses, options))
+    workers = os.cpu_count() if workers is None else workers
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        yield from filter(None, map(run_job, tasks))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(run_job, task) for task in tasks]):
+            record = future.result()
+            if record is not None:
+                yield record
+
+
+def _finite(value):
+    # JSON has no NaN or Infinity, e.g. a mean first passage no path reached
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m components", description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="chain files (.json, .npz) or directories")
+    parser.add_argument("--analyses", nargs="+", choices=ANALYSES, default=["classify"])
+    parser.add_argument("--method", choices=["auto", "direct", "power", "iterative"], default="auto",
+                        help="stationary solver")
+    parser.add_argument("--initial", help="initial state of the simulations (default: the first state)")
+    parser.add_argument("--targets", nargs="+", help="states whose first-passage time is measured")
+    parser.add_argument("--steps", type=int, nargs="+", default=[100])
+    parser.add_argument("--horizon", type=float, nargs="+", default=[10.0], help="simulated time of continuous chains")
+    parser.add_argument("--paths", type=int, nargs="+", default=[1000], dest="n_paths", metavar="PATHS")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--sampler", choices=["cumulative", "alias"], default="cumulative")
+    parser.add_argument("--workers", type=int, help="processes in the pool (default: one per CPU)")
+    parser.add_argument("--output", help="write the JSON Lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    files = chain_files(args.paths)
+    if not files:
+        parser.error("no .json or .npz files found")
+    options = {"method": args.method, "initial": args.initial, "targets": args.targets, "steps": args.steps,
+               "horizon": args.horizon, "paths": args.n_paths, "seeds": args.seeds, "sampler": args.sampler}
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    failed = False
+    try:
+        for record in run(files, args.analyses, options, workers=args.workers):
+            failed |= "error" in record
+            out.write(json.dumps(_finite(record), default=str, allow_nan=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
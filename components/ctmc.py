@@ -0,0 +1,271 @@
+from dataclasses import dataclass
+from math import lgamma, log, sqrt
+
+import numpy as np
+
+from .chain import MarkovChain
+from .matrix import SparseTransitionMatrix, use_sparse, vecmat
+from .profiling import profiled
+from .sampling import make_sampler
+
+# Λ = factor * max exit rate keeps a self loop on every state of the
+# uniformized chain, so it is aperiodic like the continuous chain itself
+UNIFORMIZATION_FACTOR = 1.02
+# above this many Poisson terms per interval expm_multiply is cheaper
+MAX_UNIFORMIZATION_STEPS = 20000
+
+
+def poisson_step(matrix, rate, x, tol=1e-12):
+    """``x @ exp(rate * (P - I))`` as a Poisson mixture of ``x @ P^k``.
+
+    Terms are added until the Poisson tail is below ``tol``; the weights
+    are computed in log space so a large ``rate`` doesn't underflow.
+    """
+    result = np.zeros_like(x)
+    if rate <= 0:
+        return x.copy()
+    last = int(rate + 10 * sqrt(rate) + 50)
+    total = 0.0
+    log_rate = log(rate)
+    for k in range(last + 1):
+        weight = np.exp(k * log_rate - rate - lgamma(k + 1))
+        result += weight * x
+        total += weight
+        if k >= rate and 1.0 - total < tol:
+            break
+        x = vecmat(matrix, x)
+    return result
+
+
+@dataclass(frozen=True)
+class GillespieResult:
+    """Aggregated statistics of ``paths`` trajectories over ``[0, horizon]``.
+
+    ``occupancy[i]`` is the total time spent in state ``i`` by all paths,
+    ``final[i]`` counts the paths in ``i`` at ``horizon`` and, when
+    observation times were given, ``observed[p, j]`` is the state of path
+    ``p`` at ``times[j]``.
+    """
+
+    paths: int
+    horizon: float
+    occupancy: np.ndarray
+    jumps: int
+    final: np.ndarray
+    times: np.ndarray = None
+    observed: np.ndarray = None
+
+    @property
+    def occupancy_distribution(self):
+        return self.occupancy / (self.paths * self.horizon)
+
+    @property
+    def final_distribution(self):
+        return self.final / self.paths
+
+    def observed_distribution(self, j):
+        return np.bincount(self.observed[:, j], minlength=len(self.final)) / self.paths
+
+
+def gillespie(sampler, exit_rates, initial, horizon, paths, rng=None, times=None):
+    """Simulate ``paths`` trajectories at once, one vectorized jump per loop.
+
+    Holding times are exponential with the exit rate of the current state
+    and the next state is drawn from the jump chain by ``sampler``; a loop
+    iteration moves every path that is still before ``horizon``, so the
+    number of iterations is the largest jump count, not the total.
+    """
+    rng = np.random.default_rng(rng)
+    n = len(exit_rates)
+    state = np.full(paths, initial, dtype=np.int64)
+    clock = np.zeros(paths)
+    occupancy = np.zeros(n)
+    jumps = 0
+    if times is not None:
+        times = np.asarray(times, dtype="float64")
+        observed = np.empty((paths, len(times)), dtype=np.int32)
+        seen = np.zeros(paths, dtype=np.int64)
+    active = np.arange(paths)
+    while len(active) > 0:
+        current = state[active]
+        rate = exit_rates[current]
+        with np.errstate(divide="ignore"):
+            leave = clock[active] + rng.exponential(size=len(active)) / rate
+        occupancy += np.bincount(current, weights=np.minimum(leave, horizon) - clock[active], minlength=n)
+        if times is not None:
+            # every observation time before the jump sees the current state
+            upto = np.searchsorted(times, leave, side="left")
+            counts = upto - seen[active]
+            rows = np.repeat(active, counts)
+            cols = np.repeat(seen[active] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            observed[rows, cols] = np.repeat(current, counts)
+            seen[active] = upto
+        moving = leave < horizon
+        active = active[moving]
+        state[active] = sampler.step(current[moving], rng)
+        clock[active] = leave[moving]
+        jumps += len(active)
+    return GillespieResult(paths=paths, horizon=horizon, occupancy=occupancy, jumps=jumps,
+                           final=np.bincount(state, minlength=n), times=times,
+                           observed=observed if times is not None else None)
+
+
+class ContinuousChain:
+    """Headless continuous-time chain: state labels plus off-diagonal rates in CSR.
+
+    The generator is ``Q = R - diag(q)`` with ``q`` the exit rates.
+    Classification and stationary vectors come from the uniformized chain
+    ``P = I + Q / Λ``, which has the same classes and satisfies
+    ``π P = π`` exactly when ``π Q = 0``; transient distributions use the
+    same chain (uniformization) or a Krylov ``expm_multiply`` on ``Q``.
+    """
+
+    def __init__(self, states, rates):
+        self.states = list(states)
+        self.index = {state: i for i, state in enumerate(self.states)}
+        self.rates = rates
+        self._cache = {}
+
+    @classmethod
+    def from_edges(cls, states, rows, cols, rates):
+        """Rates on ``(rows[k], cols[k])``; self loops mean nothing in continuous time and are dropped."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        rates = np.asarray(rates, dtype="float64")
+        keep = rows != cols
+        return cls(states, SparseTransitionMatrix.from_coo(len(states), rows[keep], cols[keep], rates[keep]))
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+    def exit_rates(self):
+        return self._cached("exit_rates", self.rates.row_sums)
+
+    def invalid_rows(self):
+        """States with a negative or non-numeric rate."""
+        return self._cached("invalid_rows", lambda: np.unique(self.rates.rows[~(self.rates.data >= 0)]))
+
+    @property
+    def uniformization_rate(self):
+        highest = float(self.exit_rates().max(initial=0.0))
+        return UNIFORMIZATION_FACTOR * highest if highest > 0 else 1.0
+
+    def generator(self):
+        """``Q`` in CSR, diagonal included."""
+        def build():
+            diagonal = np.arange(self.n_states)
+            return SparseTransitionMatrix.from_coo(self.n_states,
+                                                   np.concatenate([self.rates.rows, diagonal]),
+                                                   np.concatenate([self.rates.indices, diagonal]),
+                                                   np.concatenate([self.rates.data, -self.exit_rates()]))
+        return self._cached("generator", build)
+
+    def dense_generator(self):
+        return self.generator().to_dense()
+
+    def uniformized(self):
+        """The discrete chain ``P = I + Q / Λ`` as a :class:`MarkovChain`."""
+        def build():
+            rate = self.uniformization_rate
+            diagonal = np.arange(self.n_states)
+            matrix = SparseTransitionMatrix.from_coo(self.n_states,
+                                                     np.concatenate([self.rates.rows, diagonal]),
+                                                     np.concatenate([self.rates.indices, diagonal]),
+                                                     np.concatenate([self.rates.data / rate,
+                                                                     1.0 - self.exit_rates() / rate]))
+            return MarkovChain(self.states, matrix)
+        return self._cached("uniformized", build)
+
+    def classify(self):
+        return self.uniformized().classify()
+
+    def stationary_distribution(self, method="auto", tol=1e-12, max_iter=100000):
+        return self.uniformized().stationary_distribution(method=method, tol=tol, max_iter=max_iter)
+
+    def mean_holding_times(self):
+        with np.errstate(divide="ignore"):
+            return 1.0 / self.exit_rates()
+
+    def expected_hitting_times(self, targets):
+        # every uniformized step lasts Exp(Λ), so times are steps / Λ
+        return self.uniformized().expected_hitting_times(targets) / self.uniformization_rate
+
+    def expected_time_to_absorption(self):
+        return self.uniformized().absorbing().expected_steps() / self.uniformization_rate
+
+    def distribution(self, initial):
+        return self.uniformized().distribution(initial)
+
+    @profiled
+    def transient(self, initial, times, method="auto", tol=1e-12):
+        """Rows of ``P(X_t = j)`` for every ``t`` in ``times``.
+
+        The times are visited in increasing order and each one starts from
+        the previous distribution, so only the gaps are integrated.
+        ``"uniformization"`` costs about ``Λ Δt`` sparse products per gap,
+        ``"krylov"`` calls SciPy's ``expm_multiply`` on ``Qᵀ``; ``"auto"``
+        switches to the latter when a gap would need too many products.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype="float64"))
+        if len(times) and times.min() < 0:
+            raise ValueError("times must be non-negative")
+        x = self.distribution(initial)
+        out = np.empty((len(times), self.n_states))
+        rate = self.uniformization_rate
+        chain = self.uniformized()
+        previous = 0.0
+        for i in np.argsort(times, kind="stable"):
+            gap = times[i] - previous
+            if method == "krylov" or (method == "auto" and rate * gap > MAX_UNIFORMIZATION_STEPS):
+                x = self._expm_multiply(x, gap)
+            else:
+                x = poisson_step(chain.analysis_matrix(), rate * gap, x, tol=tol)
+            out[i] = x
+            previous = times[i]
+        return out
+
+    def _expm_multiply(self, x, t):
+        from scipy.sparse.linalg import expm_multiply
+
+        generator = self.generator()
+        if use_sparse(self.n_states, generator.nnz):
+            transposed = self._cached("generator_t", lambda: generator.to_scipy().T.tocsr())
+        else:
+            transposed = self._cached("dense_generator_t", lambda: np.ascontiguousarray(generator.to_dense().T))
+        return expm_multiply(transposed * t, x)
+
+    def sampler(self, sampler="cumulative"):
+        # the samplers normalize each row, so the rates give the jump chain directly
+        return self._cached(("sampler", sampler), lambda: make_sampler(self.rates, sampler))
+
+    @profiled
+    def simulate(self, initial, horizon, paths=1, seed=None, times=None, sampler="cumulative"):
+        if horizon <= 0:
+            raise ValueError("horizon must be positive")
+        if paths < 1:
+            raise ValueError("paths must be at least 1")
+        if times is not None and np.max(times, initial=0.0) > horizon:
+            raise ValueError("observation times must not exceed the horizon")
+        return gillespie(self.sampler(sampler), self.exit_rates(), initial, horizon, paths, rng=seed, times=times)
+
+    def trajectory(self, initial, horizon, seed=None, max_jumps=10000, sampler="cumulative"):
+        """Jump times and states of one path, starting with ``(0, initial)``."""
+        rng = np.random.default_rng(seed)
+        sample = self.sampler(sampler)
+        exit_rates = self.exit_rates()
+        times, states = [0.0], [int(initial)]
+        clock, state = 0.0, int(initial)
+        while len(states) <= max_jumps and exit_rates[state] > 0:
+            clock += rng.exponential() / exit_rates[state]
+            if clock >= horizon:
+                break
+            state = int(sample.step(np.array([state]), rng)[0])
+            times.append(clock)
+            states.append(state)
+        return np.array(times), np.array(states, dtype=np.int32)
@@ -0,0 +1,62 @@
+import numpy as np
+import sympy as sp
+
+
+def parse_expression(text, n_states):
+    """Parse ``text`` with ``T`` bound to an ``n_states x n_states`` matrix symbol."""
+    T = sp.MatrixSymbol("T", n_states, n_states)
+    return sp.parse_expr(text, local_dict={"T": T}, transformations="all"), T
+
+
+def _matrix_exp(x):
+    # exp of a matrix is the matrix exponential, as SymPy computes it exactly
+    if np.ndim(x) == 2:
+        from scipy.linalg import expm
+        return expm(x)
+    return np.exp(x)
+
+
+def _matrix_functions(expr):
+    """Functions applied to a whole matrix, like ``exp(T)``, not to an entry."""
+    return {function.func for function in expr.atoms(sp.Function)
+            if any(isinstance(arg, sp.MatrixExpr) for arg in function.args)}
+
+
+def compile_expression(expr, T):
+    """Compile ``expr`` into a NumPy function of the transition matrix.
+
+    ``exp`` of a matrix is compiled to ``scipy.linalg.expm``, matching the
+    exact mode. Other functions of a matrix, and expressions the NumPy
+    printer can't handle, fall back to substituting a float matrix into the
+    SymPy expression.
+    """
+    def evaluate(matrix):
+        result = expr.subs(T, sp.ImmutableMatrix(matrix)).doit()
+        return np.array(result.tolist(), dtype="float64") if hasattr(result, "tolist") else float(result)
+
+    if not _matrix_functions(expr) <= {sp.exp}:
+        return evaluate
+    try:
+        return sp.lambdify(T, expr, modules=[{"exp": _matrix_exp}, "numpy"])
+    except Exception:
+        return evaluate
+
+
+def exact_matrix(n_states, rows, cols, labels):
+    """Transition matrix with exact rationals parsed from the edge labels."""
+    matrix = sp.zeros(n_states, n_states)
+    for row, col, label in zip(rows.tolist(), cols.tolist(), labels):
+        matrix[row, col] = sp.Rational(str(label))
+    return sp.ImmutableMatrix(matrix)
+
+
+def exact_generator(n_states, rows, cols, labels):
+    """Generator ``Q`` with exact rationals: the rates off the diagonal, minus their row sum on it."""
+    generator = exact_matrix(n_states, rows, cols, labels).as_mutable()
+    for i in range(n_states):
+        generator[i, i] = -sum(generator.row(i))
+    return sp.ImmutableMatrix(generator)
+
+
+def evaluate_exact(expr, T, matrix):
+    return expr.subs(T, matrix).doit()
@@ -1,21 +1,324 @@
-import streamlit as st
-from streamlit_agraph import agraph, Node, Edge, Config
+import json
+from array import array
+from itertools import islice
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .layout import dot_id
+from .profiling import profiled
+
+if TYPE_CHECKING:
+    from streamlit_agraph import Node, Edge
+
+# streamlit_agraph defaults, so dicts round-trip exactly like Node/Edge.to_dict()
+DEFAULT_EDGE_COLOR = "#F7A7A6"
+# label slot meaning "repr(probability)", so numeric labels cost nothing to keep
+DERIVED_LABEL = -1
+# keys of an edge dict that are columns, everything else is style
+EDGE_KEYS = frozenset(("source", "from", "to", "label"))
+# header of the .npz layout written by Graph.save_npz
+FORMAT = "stochastic-graph"
+FORMAT_VERSION = 1
+# nodes/edges per chunk yielded by Graph.iter_json
+JSON_CHUNK = 10000
+
+
+def node_dict(id, title=None, label=None, color=None, shape="dot", size=25, **kwargs):
+    return {"id": id, "title": title if title else id, "label": label, "shape": shape,
+            "size": size, "color": color, **kwargs}
+
+
+def edge_dict(source, target, color=DEFAULT_EDGE_COLOR, **kwargs):
+    return {"source": source, "from": source, "to": target, "color": color, **kwargs}
+
+
+def _json_array(value):
+    return np.frombuffer(json.dumps(value).encode("utf-8"), dtype=np.uint8)
+
+
+def _from_json_array(values):
+    return json.loads(np.asarray(values).tobytes().decode("utf-8"))
+
+
+def _json_items(items, chunk_size):
+    items = iter(items)
+    separator = ""
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        # one encoder call per chunk; strip the list brackets
+        yield separator + json.dumps(chunk)[1:-1]
+        separator = ", "
+
+
+def _column(typecode, values):
+    return array(typecode, np.ascontiguousarray(values, dtype=typecode).tobytes())
+
+
+def _csr(rows, cols, n):
+    """``(offsets, cols)`` with the columns grouped by row, each row in slot order."""
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, cols[order]
+
+
+def _probability(label):
+    try:
+        return float(label)
+    except (TypeError, ValueError):
+        return float("nan")
+
 
 class Graph:
+    """Directed graph stored as parallel columns instead of agraph objects.
+
+    State ids are interned to integers; every edge is one slot in the
+    ``array`` columns ``_sources``/``_targets`` (int32), ``_probabilities``
+    (float64) and ``_label_ids``/``_style_ids`` (int32). Labels and visual
+    attributes (colors, shapes, ...) live in interned side tables, and the
+    streamlit_agraph ``Node``/``Edge`` objects are only built on demand by
+    ``nodes``/``edges`` for rendering.
+    """
+
     def __init__(self, nodes: list = None , edges: list = None):
-        self.nodes: list = nodes if nodes is not None else []
-        self.edges: list = edges if edges is not None else []
-        self._node_set: set = set()
-        self._edge_set: set = set()
+        self._clear()
+        self.nodes = nodes if nodes is not None else []
+        self.edges = edges if edges is not None else []
+
+    def _clear(self):
+        self._ids: list = []
+        self._id_index: dict = {}
+        self._node_ids: list = []
+        self._node_attributes: dict = {}
+        self._clear_edges()
+
+    def _clear_edges(self):
+        self._sources = array("i")
+        self._targets = array("i")
+        self._probabilities = array("d")
+        self._label_ids = array("i")
+        self._style_ids = array("i")
+        self._labels: list = []
+        self._label_index: dict = {}
+        self._styles: list = []
+        self._style_index: dict = {}
+        # (source, target) -> slot, built on the first point lookup only
+        self._edge_lookup = None
+        # CSR offsets and neighbours by interned key, outgoing and incoming,
+        # built on the first successors/predecessors call after an edit
+        self._adjacency = None
+
+    def _touch(self, changed=None):
+        # called after every mutation; edge-only edits pass their
+        # (source, target, old, new) interned keys and probabilities, where
+        # None means the edge is absent
+        pass
+
+    def _intern(self, id):
+        key = self._id_index.get(id)
+        if key is None:
+            key = self._id_index[id] = len(self._ids)
+            self._ids.append(id)
+        return key
+
+    def _intern_label(self, label, probability):
+        if isinstance(label, str) and label == repr(probability):
+            return DERIVED_LABEL
+        key = repr(label)
+        slot = self._label_index.get(key)
+        if slot is None:
+            slot = self._label_index[key] = len(self._labels)
+            self._labels.append(label)
+        return slot
+
+    def _intern_style(self, style):
+        key = repr(style)
+        slot = self._style_index.get(key)
+        if slot is None:
+            slot = self._style_index[key] = len(self._styles)
+            self._styles.append(style)
+        return slot
+
+    @property
+    @profiled
+    def nodes(self):
+        from streamlit_agraph import Node
+        return [Node(**attributes) for attributes in self.node_dicts()]
+
+    @nodes.setter
+    def nodes(self, nodes):
+        self._node_ids = []
+        self._node_attributes = {}
+        for node in nodes:
+            self._add_node(dict(node.to_dict()))
+        self._touch()
+
+    @property
+    @profiled
+    def edges(self):
+        from streamlit_agraph import Edge
+        return [Edge(source=attributes.pop("source"), target=attributes.pop("to"),
+                     **{k: v for k, v in attributes.items() if k != "from"})
+                for attributes in self.edge_dicts()]
+
+    @edges.setter
+    def edges(self, edges):
+        self._clear_edges()
+        for edge in edges:
+            self._add_edge(dict(edge.to_dict()))
+        self._touch()
+
+    def _add_node(self, attributes):
+        key = self._intern(attributes["id"])
+        if key not in self._node_attributes:
+            self._node_ids.append(key)
+        self._node_attributes[key] = attributes
+
+    def _add_edge(self, attributes):
+        source = self._intern(attributes.pop("source"))
+        target = self._intern(attributes.pop("to"))
+        attributes.pop("from", None)
+        label = attributes.pop("label", None)
+        probability = _probability(label)
+        if self._edge_lookup is not None:
+            self._edge_lookup[(source, target)] = len(self._sources)
+        self._adjacency = None
+        self._sources.append(source)
+        self._targets.append(target)
+        self._probabilities.append(probability)
+        self._label_ids.append(self._intern_label(label, probability))
+        self._style_ids.append(self._intern_style(attributes))
+        return source, target
+
+    def _lookup(self):
+        if self._edge_lookup is None:
+            # like the old (source, target) index, the last duplicate wins
+            self._edge_lookup = {pair: slot for slot, pair in enumerate(zip(self._sources, self._targets))}
+        return self._edge_lookup
 
-    def add_node(self, node: Node):
-        self.nodes.append(node)
-        self._node_set.add(node.id)
+    def _slot(self, id_source, id_target):
+        source = self._id_index.get(id_source)
+        target = self._id_index.get(id_target)
+        if source is None or target is None:
+            return None
+        return self._lookup().get((source, target))
 
-    def add_edge(self, edge: Edge):
-        self.edges.append(edge)
-        data = edge.to_dict()
-        self._edge_set.add((data["source"], data["to"], data["label"]))
+    def add_node(self, node: "Node"):
+        self._add_node(dict(node.to_dict()))
+        self._touch()
+
+    def add_edge(self, edge: "Edge"):
+        attributes = dict(edge.to_dict())
+        slot = self._slot(attributes["source"], attributes["to"])
+        if slot is not None:
+            # an existing edge is replaced, like in the transition matrix
+            old = self._probabilities[slot]
+            self._remove_slot(slot)
+        else:
+            old = None
+        source, target = self._add_edge(attributes)
+        self._touch([(source, target, old, self._probabilities[-1])])
+
+    def set_edge_label(self, id_source: str, id_target: str, label):
+        """Reweight an edge in place, keeping its style; returns False if it doesn't exist."""
+        slot = self._slot(id_source, id_target)
+        if slot is None:
+            return False
+        old = self._probabilities[slot]
+        self._probabilities[slot] = _probability(label)
+        self._label_ids[slot] = self._intern_label(label, self._probabilities[slot])
+        self._touch([(self._sources[slot], self._targets[slot], old, self._probabilities[slot])])
+        return True
+
+    def remove_edge(self, id_source: str, id_target: str):
+        slot = self._slot(id_source, id_target)
+        if slot is None:
+            return False
+        change = (self._sources[slot], self._targets[slot], self._probabilities[slot], None)
+        self._remove_slot(slot)
+        self._touch([change])
+        return True
+
+    def _remove_slot(self, slot):
+        self._adjacency = None
+        lookup = self._lookup()
+        del lookup[(self._sources[slot], self._targets[slot])]
+        # move the last edge into the hole, so removal is O(1)
+        last = len(self._sources) - 1
+        if slot != last:
+            for column in (self._sources, self._targets, self._probabilities, self._label_ids, self._style_ids):
+                column[slot] = column[last]
+            lookup[(self._sources[slot], self._targets[slot])] = slot
+        for column in (self._sources, self._targets, self._probabilities, self._label_ids, self._style_ids):
+            column.pop()
+
+    @profiled
+    def remove_node(self, id: str):
+        key = self._id_index.get(id)
+        if key is None or key not in self._node_attributes:
+            return False
+        self._node_ids.remove(key)
+        del self._node_attributes[key]
+        sources, targets = self.edge_columns()
+        keep = np.flatnonzero((sources != key) & (targets != key))
+        if len(keep) != len(sources):
+            for name in ("_sources", "_targets", "_probabilities", "_label_ids", "_style_ids"):
+                column = getattr(self, name)
+                setattr(self, name, _column(column.typecode, np.frombuffer(column, dtype=column.typecode)[keep]))
+            self._edge_lookup = None
+            self._adjacency = None
+        self._touch()
+        return True
+
+    def edge_columns(self):
+        """Interned ``(sources, targets)`` as int32 NumPy copies of the edge columns."""
+        return np.array(self._sources, dtype=np.int32), np.array(self._targets, dtype=np.int32)
+
+    def edge_probabilities(self):
+        return np.array(self._probabilities, dtype="float64")
+
+    def edge_label(self, slot):
+        label = self._label_ids[slot]
+        if label == DERIVED_LABEL:
+            return repr(self._probabilities[slot])
+        return self._labels[label]
+
+    def edge_labels(self):
+        return [self.edge_label(slot) for slot in range(len(self._sources))]
+
+    def ids(self, keys):
+        """Map interned integer keys back to state ids."""
+        return [self._ids[key] for key in keys]
+
+    def node_ids(self):
+        return self.ids(self._node_ids)
+
+    def node_dicts(self):
+        return [dict(self._node_attributes[key]) for key in self._node_ids]
+
+    def edge_dict(self, slot):
+        return edge_dict(self._ids[self._sources[slot]], self._ids[self._targets[slot]],
+                         label=self.edge_label(slot), **self._styles[self._style_ids[slot]])
+
+    def _iter_edge_dicts(self):
+        ids, styles, labels = self._ids, self._styles, self._labels
+        for source, target, probability, label, style in zip(self._sources, self._targets, self._probabilities,
+                                                             self._label_ids, self._style_ids):
+            source = ids[source]
+            # same keys and order as edge_dict(), without the call overhead
+            attributes = {"source": source, "from": source, "to": ids[target], "color": DEFAULT_EDGE_COLOR,
+                          "label": repr(probability) if label == DERIVED_LABEL else labels[label]}
+            attributes.update(styles[style])
+            yield attributes
+
+    def edge_dicts(self):
+        return list(self._iter_edge_dicts())
+
+    def number_of_edges(self):
+        return len(self._sources)
 
     def get_nodes(self):
         return self.nodes
@@ -24,106 +327,211 @@ class Graph:
         return self.edges
 
     def is_empty(self):
-        return len(self.nodes) == 0
+        return len(self._node_ids) == 0
 
     def in_nodes(self, id: str):
-        return any(node.id == id for node in self.nodes)
+        return self._id_index.get(id) in self._node_attributes
 
     def in_edges(self, id_source: str, id_target: str):
-        for edge in self.edges:
-            dict_edge = edge.to_dict()
-            if dict_edge["source"] == id_source and dict_edge["to"] == id_target:
-                return True
+        return self._slot(id_source, id_target) is not None
 
-        return False
+    def get_edge(self, id_source: str, id_target: str):
+        slot = self._slot(id_source, id_target)
+        if slot is None:
+            return None
+        from streamlit_agraph import Edge
+        attributes = self.edge_dict(slot)
+        attributes.pop("from")
+        return Edge(source=attributes.pop("source"), target=attributes.pop("to"), **attributes)
 
-    def get_adjacency(self):
-        matrix = []
-        for node in self.nodes:
-            row = {node.id: []}
-            for node2 in self.nodes:
-                if self.in_edges(node.id, node2.id):
-                    row[node.id].append(node2.id)
+    def _neighbours(self, id, incoming):
+        key = self._id_index.get(id)
+        if key is None:
+            return []
+        if self._adjacency is None:
+            sources, targets = self.edge_columns()
+            self._adjacency = tuple(_csr(rows, cols, len(self._ids))
+                                    for rows, cols in ((sources, targets), (targets, sources)))
+        offsets, neighbours = self._adjacency[incoming]
+        if key + 1 >= len(offsets):
+            # interned after the adjacency was built, so it has no edges
+            return []
+        return self.ids(dict.fromkeys(neighbours[offsets[key]:offsets[key + 1]].tolist()))
+
+    def successors(self, id: str):
+        """Targets of the edges leaving ``id``, in O(out-degree) once the adjacency is built."""
+        return self._neighbours(id, incoming=False)
 
-            matrix.append(row)
-        return matrix
+    def predecessors(self, id: str):
+        return self._neighbours(id, incoming=True)
 
+    @profiled
+    def get_adjacency(self):
+        position = np.full(len(self._ids), -1, dtype=np.int64)
+        position[self._node_ids] = np.arange(len(self._node_ids))
+        sources, targets = self.edge_columns()
+        rows, cols = position[sources], position[targets]
+        keep = (rows >= 0) & (cols >= 0)
+        pairs = np.unique(rows[keep] * max(len(self._node_ids), 1) + cols[keep])
+        rows, cols = np.divmod(pairs, max(len(self._node_ids), 1))
+        bounds = np.searchsorted(rows, np.arange(len(self._node_ids) + 1))
+        node_ids = self.node_ids()
+        return [{node_ids[i]: [node_ids[j] for j in cols[bounds[i]:bounds[i + 1]].tolist()]}
+                for i in range(len(node_ids))]
+
+    @profiled
     def get_incidence(self):
-        matrix = []
-        for edge in self.edges:
-            row = {edge.source: []}
-            for node in self.nodes:
-                if edge.to == node.id:
-                    row[edge.source].append(node.id)
+        return [{self._ids[source]: [self._ids[target]] if target in self._node_attributes else []}
+                for source, target in zip(self._sources, self._targets)]
 
-            matrix.append(row)
-        return matrix
 
+    def iter_dot(self,t="digraph"):
+        """Stream the DOT source one statement at a time, in O(V + E)."""
+        yield f"{t} G {{\n"
+        arrow = "->" if t == "digraph" else "--"
+        ids = self._ids
+        for slot, (source, target) in enumerate(zip(self._sources, self._targets)):
+            yield f'{dot_id(ids[source])} {arrow} {dot_id(ids[target])} [label={dot_id(self.edge_label(slot))}];\n'
+        connected = set(self._sources)
+        connected.update(self._targets)
+        for key in self._node_ids:
+            if key not in connected:
+                yield f'{dot_id(ids[key])} [label={dot_id(self._node_attributes[key]["label"])}];\n'
+        yield "}"
 
+    @profiled
     def to_dot(self,t="digraph"):
-        dot = f"{t} G {{\n"
-        if len(self.edges) == 0:
-            for node in self.nodes:
-                node_dict = node.to_dict()
-                dot += f'{node_dict["id"]} [label="{node_dict["label"]}"];\n'
-        else:
-            nodeids  = []
-            for node in self.edges:
-                edge_dict = node.to_dict()
-                if edge_dict["source"] not in nodeids:
-                    nodeids.append(edge_dict["source"])
-                if edge_dict["to"] not in nodeids:
-                    nodeids.append(edge_dict["to"])
-
-                dot += f'{edge_dict["source"]} -> {edge_dict["to"]} [label="{edge_dict["label"]}"];\n'
-
-            for node in self.nodes:
-                if node.id not in nodeids:
-                    node_dict = node.to_dict()
-                    dot += f'{node_dict["id"]} [label="{node_dict["label"]}"];\n'
-        dot += "}"
-        return dot
-
-    @st.experimental_fragment
+        return "".join(self.iter_dot(t))
+
     def render_graph(self,config: dict = None):
-        if config is None:
-            config = Config(height=500,
-                            width=500,
-                            directed=True,
-                            physics=True,
-                            hierarchical=False
-                        )
-        else:
-            config = Config(**config)
+        from .rendering import render_graph
+        render_graph(self, config)
 
-        fragment = agraph(self.nodes, self.edges, config=config)
-        st.write(fragment)
-       
+    def _header(self):
+        # top-level fields saved next to the nodes and edges (JSON) or in the npz header
+        return {}
+
+    def _load_header(self, header):
+        pass
+
+    @profiled
     def get_json(self):
         return {
-            "nodes": [node.to_dict() for node in self.nodes],
-            "edges": [edge.to_dict() for edge in self.edges]
+            **self._header(),
+            "nodes": self.node_dicts(),
+            "edges": self.edge_dicts()
         }
-        
+
+    def iter_json(self, chunk_size: int = JSON_CHUNK):
+        """Yield ``json.dumps(self.get_json())`` in chunks of ``chunk_size`` nodes or edges."""
+        yield "{" + "".join(f"{json.dumps(key)}: {json.dumps(value)}, " for key, value in self._header().items())
+        yield '"nodes": ['
+        yield from _json_items(self.node_dicts(), chunk_size)
+        yield '], "edges": ['
+        yield from _json_items(self._iter_edge_dicts(), chunk_size)
+        yield "]}"
+
+    @profiled
+    def save_json(self, file):
+        for chunk in self.iter_json():
+            file.write(chunk)
+
+    @profiled
     def load_json(self, data: dict):
-        self.nodes = [Node(**node) for node in data["nodes"]]
-        self.edges = []
-        for edge in data["edges"]:
-            source = edge["source"]
-            target = edge["to"]
-            label = edge["label"]
-            del edge["source"]
-            del edge["to"]
-            del edge["label"]
-            del edge["from"]
-            
-            self.add_edge(Edge(source=source, target=target, label=label, **edge))
-            
+        # bulk load: no agraph objects, no per-edge lookup maintenance
+        self._clear()
+        self._load_header(data)
+        for node in data["nodes"]:
+            self._add_node(node_dict(**node))
+        edges = data["edges"]
+        intern = self._intern
+        labels = [edge["label"] for edge in edges]
+        probabilities = [_probability(label) for label in labels]
+        self._sources = array("i", [intern(edge["source"]) for edge in edges])
+        self._targets = array("i", [intern(edge["to"]) for edge in edges])
+        self._probabilities = array("d", probabilities)
+        self._label_ids = array("i", map(self._intern_label, labels, probabilities))
+        self._style_ids = array("i", [self._intern_style({key: value for key, value in edge.items() if key not in EDGE_KEYS})
+                                      for edge in edges])
+        self._touch()
+
+    @profiled
+    def to_arrays(self, visuals: bool = True):
+        """Columnar form of the graph, as written by :meth:`save_npz`.
+
+        Strings and side tables are stored as UTF-8 JSON in ``uint8`` arrays,
+        so the file never needs pickle. Unused interned ids are dropped.
+        """
+        sources, targets = self.edge_columns()
+        nodes = np.asarray(self._node_ids, dtype=np.int64)
+        used = np.unique(np.concatenate([nodes, sources, targets]))
+        position = np.zeros(len(self._ids), dtype=np.int32)
+        position[used] = np.arange(len(used))
+        arrays = {
+            "format": _json_array({"format": FORMAT, "version": FORMAT_VERSION, **self._header()}),
+            "states": _json_array(self.ids(used.tolist())),
+            "nodes": position[nodes],
+            "source": position[sources],
+            "target": position[targets],
+            "probability": self.edge_probabilities(),
+            "label": np.array(self._label_ids, dtype=np.int32),
+            "labels": _json_array(self._labels),
+        }
+        if visuals:
+            arrays["node_attributes"] = _json_array([{key: value for key, value in self._node_attributes[node].items()
+                                                      if key != "id"} for node in self._node_ids])
+            arrays["style"] = np.array(self._style_ids, dtype=np.int32)
+            arrays["styles"] = _json_array(self._styles)
+        return arrays
+
+    @profiled
+    def from_arrays(self, arrays):
+        """Bulk load the output of :meth:`to_arrays`; visuals default like a bare ``Node``/``Edge``."""
+        header = _from_json_array(arrays["format"])
+        if header.get("format") != FORMAT or header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"unsupported graph file: {header}")
+        self._clear()
+        self._load_header(header)
+        self._ids = _from_json_array(arrays["states"])
+        self._id_index = {id: key for key, id in enumerate(self._ids)}
+        self._node_ids = np.asarray(arrays["nodes"]).tolist()
+        if "node_attributes" in arrays:
+            attributes = _from_json_array(arrays["node_attributes"])
+        else:
+            attributes = [{"label": self._ids[key]} for key in self._node_ids]
+        self._node_attributes = {key: node_dict(self._ids[key], **node)
+                                 for key, node in zip(self._node_ids, attributes)}
+        n_edges = len(arrays["source"])
+        self._sources = _column("i", arrays["source"])
+        self._targets = _column("i", arrays["target"])
+        self._probabilities = _column("d", arrays["probability"])
+        self._label_ids = _column("i", arrays["label"])
+        self._labels = _from_json_array(arrays["labels"])
+        self._label_index = {repr(label): slot for slot, label in enumerate(self._labels)}
+        if "style" in arrays:
+            self._style_ids = _column("i", arrays["style"])
+            self._styles = _from_json_array(arrays["styles"])
+        else:
+            self._style_ids = array("i", bytes(4 * n_edges))
+            self._styles = [{}]
+        self._style_index = {repr(style): slot for slot, style in enumerate(self._styles)}
+        self._touch()
+
+    @profiled
+    def save_npz(self, file, visuals: bool = True, compressed: bool = True):
+        save = np.savez_compressed if compressed else np.savez
+        save(file, **self.to_arrays(visuals=visuals))
+
+    @profiled
+    def load_npz(self, file):
+        with np.load(file, allow_pickle=False) as arrays:
+            self.from_arrays(arrays)
 
     @property
     def ssnodes(self):
-        return self._node_set
-    
+        return set(self.node_ids())
+
     @property
     def sedges(self):
-        return self._edge_set
+        return {(self._ids[source], self._ids[target], self.edge_label(slot))
+                for slot, (source, target) in enumerate(zip(self._sources, self._targets))}
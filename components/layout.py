@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# level-of-detail defaults: above these the view collapses or prunes
+MAX_VISIBLE_NODES = 200
+MAX_VISIBLE_EDGES = 1000
+# vis.js pixels per unit of the layout square
+LAYOUT_SCALE = 60.0
+
+
+def dot_id(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def spring_layout(n, rows, cols, iterations=100, seed=0):
+    """Fruchterman-Reingold positions for ``n`` nodes, as an ``(n, 2)`` array.
+
+    Edges are taken as undirected and unweighted. Every iteration is a
+    dense O(n^2) NumPy step, which is why views are capped to a few hundred
+    nodes before they are laid out. The result is deterministic for a seed.
+    """
+    positions = np.random.default_rng(seed).uniform(-1.0, 1.0, size=(n, 2))
+    if n <= 1:
+        return positions * 0.0
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    links = rows != cols
+    rows, cols = rows[links], cols[links]
+    k = 2.0 / np.sqrt(n)
+    temperature = 0.2
+    for _ in range(iterations):
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=2), 1e-3)
+        displacement = ((k * k / distance ** 2)[:, :, None] * delta).sum(axis=1)
+        pull = positions[rows] - positions[cols]
+        length = np.maximum(np.linalg.norm(pull, axis=1), 1e-3)[:, None]
+        attraction = pull * length / k
+        np.add.at(displacement, rows, -attraction)
+        np.add.at(displacement, cols, attraction)
+        norm = np.maximum(np.linalg.norm(displacement, axis=1), 1e-9)[:, None]
+        positions += displacement / norm * np.minimum(norm, temperature)
+        temperature *= 0.97
+    positions -= positions.mean(axis=0)
+    return positions / max(np.abs(positions).max(), 1e-9)
+
+
+def aggregate_edges(groups, n_groups, rows, cols, data, sizes):
+    """Collapse state edges into group edges.
+
+    The weight from group ``a`` to ``b`` is the probability of moving to
+    ``b`` from a uniformly chosen state of ``a``.
+    """
+    keys = groups[rows].astype(np.int64) * n_groups + groups[cols]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse, weights=data) / sizes[unique // n_groups]
+    return unique // n_groups, unique % n_groups, weights
+
+
+def select_edges(weights, threshold, max_edges):
+    """Indices of the edges to draw: at least ``threshold``, the heaviest ``max_edges``."""
+    keep = np.flatnonzero(weights >= threshold)
+    if len(keep) > max_edges:
+        keep = keep[np.argsort(-weights[keep], kind="stable")[:max_edges]]
+        keep.sort()
+    return keep
+
+
+@dataclass
+class GraphView:
+    """What is actually drawn: node and edge dicts with a precomputed layout.
+
+    ``collapsed`` is set when nodes stand for communicating classes; the
+    ``hidden_*`` counters say how much the level of detail left out.
+    """
+
+    nodes: list
+    edges: list
+    collapsed: bool = False
+    hidden_nodes: int = 0
+    hidden_edges: int = 0
+    positions: np.ndarray = field(default=None, repr=False)
+
+    @property
+    def reduced(self):
+        return self.collapsed or self.hidden_nodes > 0 or self.hidden_edges > 0
+
+    def agraph_elements(self):
+        from streamlit_agraph import Node, Edge
+        nodes = [Node(**node) for node in self.nodes]
+        edges = []
+        for edge in self.edges:
+            edge = {key: value for key, value in edge.items() if key != "from"}
+            edges.append(Edge(source=edge.pop("source"), target=edge.pop("to"), **edge))
+        return nodes, edges
+
+    def iter_dot(self, t="digraph"):
+        yield f"{t} G {{\n"
+        for node in self.nodes:
+            yield f'{dot_id(node["id"])} [label={dot_id(node["label"])}];\n'
+        arrow = "->" if t == "digraph" else "--"
+        for edge in self.edges:
+            yield f'{dot_id(edge["source"])} {arrow} {dot_id(edge["to"])} [label={dot_id(edge["label"])}];\n'
+        yield "}"
+
+    def to_dot(self, t="digraph"):
+        return "".join(self.iter_dot(t))
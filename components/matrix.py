@@ -0,0 +1,153 @@
+import numpy as np
+
+# below this many states a dense matrix is always cheap enough
+SPARSE_MIN_STATES = 500
+# above this fill ratio the CSR overhead stops paying for itself
+SPARSE_MAX_FILL = 0.05
+
+
+def use_sparse(n_states, nnz):
+    if n_states < SPARSE_MIN_STATES:
+        return False
+    return nnz / float(n_states * n_states) <= SPARSE_MAX_FILL
+
+
+def vecmat(matrix, x):
+    """``x @ P`` for a dense array or a :class:`SparseTransitionMatrix`."""
+    if isinstance(matrix, SparseTransitionMatrix):
+        return matrix.vecmat(x)
+    return x @ matrix
+
+
+class SparseTransitionMatrix:
+    """Transition matrix in CSR layout, built from plain NumPy arrays.
+
+    ``indices[indptr[i]:indptr[i + 1]]`` are the targets of state ``i`` and
+    ``data`` holds the matching probabilities.
+    """
+
+    def __init__(self, indptr, indices, data, n_states):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype="float64")
+        self.n_states = n_states
+        self.rows = np.repeat(np.arange(n_states, dtype=np.int32), np.diff(self.indptr))
+
+    @classmethod
+    def from_coo(cls, n_states, rows, cols, data):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        data = np.asarray(data, dtype="float64")
+
+        # a repeated (row, col) pair keeps the last value, like dense assignment
+        keys = rows * n_states + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        keep = keep[np.argsort(keys[keep], kind="stable")]
+
+        indptr = np.zeros(n_states + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=n_states), out=indptr[1:])
+        return cls(indptr, cols[keep], data[keep], n_states)
+
+    @classmethod
+    def from_dense(cls, matrix):
+        matrix = np.asarray(matrix, dtype="float64")
+        rows, cols = np.nonzero(matrix)
+        return cls.from_coo(matrix.shape[0], rows, cols, matrix[rows, cols])
+
+    def replace_rows(self, rows, values):
+        """Copy with each of ``rows`` replaced by a ``(cols, data)`` pair, sorted by col.
+
+        Unchanged rows are moved with one vectorized copy, so the cost is
+        O(nnz) memory traffic plus the size of the new rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(rows)
+        rows = rows[order]
+        values = [values[i] for i in order]
+
+        counts = np.diff(self.indptr)
+        counts[rows] = [len(cols) for cols, _ in values]
+        indptr = np.zeros(self.n_states + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        changed = np.zeros(self.n_states, dtype=bool)
+        changed[rows] = True
+        kept = ~changed[self.rows]
+        slots = changed[np.repeat(np.arange(self.n_states), counts)]
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype="float64")
+        indices[~slots] = self.indices[kept]
+        data[~slots] = self.data[kept]
+        if len(rows):
+            indices[slots] = np.concatenate([np.asarray(cols, dtype=np.int32) for cols, _ in values])
+            data[slots] = np.concatenate([np.asarray(row, dtype="float64") for _, row in values])
+        return SparseTransitionMatrix(indptr, indices, data, self.n_states)
+
+    @property
+    def shape(self):
+        return (self.n_states, self.n_states)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def fill(self):
+        return self.nnz / float(max(self.n_states, 1) ** 2)
+
+    def row_sums(self):
+        return np.bincount(self.rows, weights=self.data, minlength=self.n_states)
+
+    def vecmat(self, x):
+        """Return ``x @ P`` for a row vector, or a ``(k, n)`` batch of them, in O(k nnz)."""
+        if np.ndim(x) == 2:
+            # one bincount over the batch, each row offset into its own block
+            k = len(x)
+            bins = self.indices + self.n_states * np.arange(k)[:, None]
+            weights = self.data * x[:, self.rows]
+            return np.bincount(bins.ravel(), weights=weights.ravel(), minlength=k * self.n_states).reshape(k, -1)
+        return np.bincount(self.indices, weights=self.data * x[self.rows], minlength=self.n_states)
+
+    def matvec(self, x):
+        """Return ``P @ x`` for a column vector ``x`` in O(nnz)."""
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.n_states)
+
+    def submatrix(self, states):
+        """Restrict the chain to ``states``, renumbered in the given order."""
+        states = np.asarray(states, dtype=np.int64)
+        position = np.full(self.n_states, -1, dtype=np.int64)
+        position[states] = np.arange(len(states))
+        keep = (position[self.rows] >= 0) & (position[self.indices] >= 0)
+        return SparseTransitionMatrix.from_coo(
+            len(states), position[self.rows[keep]], position[self.indices[keep]], self.data[keep]
+        )
+
+    def transpose(self):
+        return SparseTransitionMatrix.from_coo(self.n_states, self.indices, self.rows, self.data)
+
+    def to_dense(self):
+        matrix = np.zeros(self.shape, dtype="float64")
+        matrix[self.rows, self.indices] = self.data
+        return matrix
+
+    def to_scipy(self):
+        from scipy import sparse
+
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    def reachable(self, sources):
+        """Boolean mask of the states reachable from ``sources`` (inclusive)."""
+        seen = np.zeros(self.n_states, dtype=bool)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        seen[frontier] = True
+        while len(frontier) > 0:
+            starts = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - starts
+            # gather every slot of every frontier row without a Python loop
+            slots = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            slots = slots[self.data[slots] > 0]
+            targets = np.unique(self.indices[slots])
+            frontier = targets[~seen[targets]]
+            seen[frontier] = True
+        return seen
@@ -0,0 +1,159 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .sampling import SAMPLERS
+
+# paths per shard; shards and their seeds depend only on this, never on the
+# number of workers, which is what makes results worker-count independent
+SHARD_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class MonteCarloResult:
+    """Aggregated statistics of ``paths`` trajectories of ``steps`` states.
+
+    ``occupancy[i]`` counts visits to state ``i`` over all paths and steps.
+    ``first_passage[t]`` counts paths whose first visit to the target set at
+    a time ``>= 1`` happened at step ``t``; ``final[i]`` counts paths that
+    ended in state ``i``.
+    """
+
+    paths: int
+    steps: int
+    occupancy: np.ndarray
+    first_passage: np.ndarray
+    final: np.ndarray
+
+    @property
+    def occupancy_distribution(self):
+        return self.occupancy / self.occupancy.sum()
+
+    @property
+    def hits(self):
+        return int(self.first_passage.sum())
+
+    def mean_first_passage(self, z=1.96):
+        """Mean first-passage time of the paths that hit, with a normal CI half-width."""
+        if self.hits == 0:
+            return float("nan"), float("nan")
+        times = np.arange(len(self.first_passage))
+        mean = (times * self.first_passage).sum() / self.hits
+        var = ((times - mean) ** 2 * self.first_passage).sum() / max(self.hits - 1, 1)
+        return float(mean), float(z * np.sqrt(var / self.hits))
+
+    def outcome_probabilities(self, states):
+        """Fraction of paths that ended in each of ``states`` (e.g. absorbing states)."""
+        return self.final[np.asarray(states, dtype=np.int64)] / self.paths
+
+
+def run_shard(sampler, seed, paths, initial, steps, targets):
+    """Simulate one shard without storing trajectories."""
+    rng = np.random.default_rng(seed)
+    n = sampler.n_states
+    current = np.full(paths, initial, dtype=np.int64)
+    occupancy = np.bincount(current, minlength=n)
+    first_passage = np.zeros(steps, dtype=np.int64)
+    waiting = np.ones(paths, dtype=bool)
+
+    for t in range(1, steps):
+        current = sampler.step(current, rng)
+        occupancy += np.bincount(current, minlength=n)
+        if targets is not None:
+            arrived = waiting & targets[current]
+            first_passage[t] += np.count_nonzero(arrived)
+            waiting &= ~arrived
+
+    return occupancy, first_passage, np.bincount(current, minlength=n)
+
+
+_worker = {}
+
+
+def _attach(sampler_name, specs, targets):
+    # runs once per worker process: map the shared buffers, never copy them
+    arrays = {}
+    _worker["memory"] = []
+    for name, (block, shape, dtype) in specs.items():
+        memory = shared_memory.SharedMemory(name=block)
+        _worker["memory"].append(memory)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    _worker["sampler"] = SAMPLERS[sampler_name].from_arrays(arrays)
+    _worker["targets"] = targets
+
+
+def _run_worker_shard(task):
+    seed, paths, initial, steps = task
+    return run_shard(_worker["sampler"], seed, paths, initial, steps, _worker["targets"])
+
+
+def _share(sampler):
+    blocks = []
+    specs = {}
+    for name, array in sampler.to_arrays().items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def monte_carlo(sampler, initial, steps, paths, seed=None, targets=None, workers=None, shard_size=SHARD_SIZE):
+    """Run ``paths`` independent trajectories split into fixed-size shards.
+
+    Shard ``k`` always gets the ``k``-th child of ``SeedSequence(seed)``, so
+    the aggregated result is identical for any ``workers``. With more than
+    one worker the sampler tables are placed in shared memory once and
+    mapped by every process instead of being pickled per task.
+    """
+    if steps < 1:
+        raise ValueError("steps must be at least 1")
+    if paths < 1:
+        raise ValueError("paths must be at least 1")
+    n = sampler.n_states
+    mask = None
+    if targets is not None:
+        mask = np.zeros(n, dtype=bool)
+        mask[np.asarray(targets, dtype=np.int64)] = True
+
+    sizes = [shard_size] * (paths // shard_size)
+    if paths % shard_size:
+        sizes.append(paths % shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(child, size, initial, steps) for child, size in zip(seeds, sizes)]
+
+    workers = os.cpu_count() if workers is None else workers
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        shards = [run_shard(sampler, *task, mask) for task in tasks]
+    else:
+        sampler_name = next(name for name, cls in SAMPLERS.items() if isinstance(sampler, cls))
+        blocks, specs = _share(sampler)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(sampler_name, specs, mask)) as pool:
+                shards = list(pool.map(_run_worker_shard, tasks))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    occupancy = np.zeros(n, dtype=np.int64)
+    first_passage = np.zeros(steps, dtype=np.int64)
+    final = np.zeros(n, dtype=np.int64)
+    for shard_occupancy, shard_first_passage, shard_final in shards:
+        occupancy += shard_occupancy
+        first_passage += shard_first_passage
+        final += shard_final
+
+    return MonteCarloResult(
+        paths=paths,
+        steps=steps,
+        occupancy=occupancy,
+        first_passage=first_passage,
+        final=final,
+    )
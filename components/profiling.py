@@ -0,0 +1,125 @@
+"""Opt-in timing of the graph and chain methods.
+
+Disabled by default: a profiled method then costs one attribute check on
+top of the plain call. Enable it with :func:`enable` or the
+``STOCHASTIC_PROFILE=1`` environment variable, run the slow path, and read
+:func:`report`. There is one profiler per process, so with several
+Streamlit sessions open the numbers are shared by all of them.
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        # every Streamlit session runs in its own thread: each one keeps its
+        # own stack of open calls, the aggregated stats are shared
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear the aggregated stats; calls still open in any thread finish normally."""
+        with self._lock:
+            # name -> [calls, total, self, max, last shape, last nnz]
+            self.methods = {}
+            # name -> [hits, misses]
+            self.caches = {}
+
+    @property
+    def _stack(self):
+        # child time of each open call of this thread, innermost last
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self):
+        self._stack.append(0.0)
+
+    def _exit(self, name, elapsed, result=None):
+        stack = self._stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        # arrays and frames have a shape; chains carry theirs on .matrix
+        matrix = getattr(result, "matrix", result)
+        shape = getattr(matrix, "shape", None)
+        with self._lock:
+            record = self.methods.get(name)
+            if record is None:
+                record = self.methods[name] = [0, 0.0, 0.0, 0.0, None, None]
+            record[0] += 1
+            record[1] += elapsed
+            record[2] += elapsed - children
+            record[3] = max(record[3], elapsed)
+            if isinstance(shape, tuple):
+                record[4] = shape
+                record[5] = getattr(matrix, "nnz", record[5])
+
+    def cache(self, name, hit):
+        with self._lock:
+            record = self.caches.get(name)
+            if record is None:
+                record = self.caches[name] = [0, 0]
+            record[0 if hit else 1] += 1
+
+    def report(self):
+        """Plain dicts, slowest first, ready for ``json.dumps`` or a DataFrame."""
+        with self._lock:
+            method_items = [(name, list(record)) for name, record in self.methods.items()]
+            cache_items = [(name, list(record)) for name, record in self.caches.items()]
+        methods = [
+            {"name": name, "calls": calls, "total_s": total, "self_s": own, "max_s": longest,
+             "mean_s": total / calls, "shape": shape, "nnz": nnz}
+            for name, (calls, total, own, longest, shape, nnz) in method_items
+        ]
+        methods.sort(key=lambda row: row["total_s"], reverse=True)
+        caches = [
+            {"name": name, "hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            for name, (hits, misses) in sorted(cache_items)
+        ]
+        return {"methods": methods, "caches": caches}
+
+
+PROFILER = Profiler(enabled=os.environ.get("STOCHASTIC_PROFILE", "") not in ("", "0"))
+
+
+def profiled(func=None, *, name=None):
+    """Record wall time, calls and result shape of ``func`` while profiling is enabled."""
+    if func is None:
+        return lambda func: profiled(func, name=name)
+    label = name or func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return func(*args, **kwargs)
+        PROFILER._enter()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            PROFILER._exit(label, time.perf_counter() - start, result)
+    return wrapper
+
+
+def enable():
+    PROFILER.enabled = True
+
+
+def disable():
+    PROFILER.enabled = False
+
+
+def reset():
+    PROFILER.reset()
+
+
+def report():
+    return PROFILER.report()
@@ -0,0 +1,492 @@
+"""Streamlit views of a graph.
+
+Kept apart from the computation core so that importing ``components`` never
+pulls in Streamlit, Plotly or SymPy; the ``render_*`` methods of the graph
+classes import this module on first use.
+"""
+import json
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import sympy as sp
+from plotly import graph_objects as go
+from streamlit_agraph import agraph, Config
+
+from .profiling import PROFILER, profiled, report, reset
+from .streaming import OnlineStatistics
+
+# horizon of the n-step charts in the Regularidad tab
+MAX_HORIZON = 100
+# above this many states T is shown as a truncated LaTeX block
+LATEX_MAX_STATES = 20
+# rows and columns kept in the truncated block
+LATEX_PREVIEW = 8
+# above this many states no full matrix (table or heatmap) is sent to the browser
+TABLE_MAX_STATES = 300
+# rendered artifacts kept per graph version
+RENDER_CACHE_SIZE = 64
+
+
+def memo(graph, key, build):
+    """Rendered artifact for ``key`` (name plus widget state), built once per graph version.
+
+    The entries live in the graph's version-keyed cache, so any edit drops
+    them, and only the ``RENDER_CACHE_SIZE`` most recently used are kept.
+    """
+    cache = graph.cached("render", OrderedDict)
+    hit = key in cache
+    if PROFILER.enabled:
+        PROFILER.cache("render." + str(key[0]), hit)
+    if hit:
+        cache.move_to_end(key)
+        return cache[key]
+    value = cache[key] = build()
+    if len(cache) > RENDER_CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+
+@profiled(name="sympy.latex")
+def matrix_latex(tdf):
+    return sp.latex(sp.Matrix(tdf.to_numpy()))
+
+
+def truncated_latex(block, n_states):
+    rows = [" & ".join(f"{value:g}" for value in row) + r" & \cdots" for row in block]
+    rows.append(" & ".join([r"\vdots"] * len(block)) + r" & \ddots")
+    return r"\left[\begin{matrix}" + r"\\".join(rows) + r"\end{matrix}\right]" + rf"_{{{n_states} \times {n_states}}}"
+
+
+def matrix_block(graph, size):
+    """The top-left ``size`` x ``size`` corner of T (Q if continuous), without densifying the rest."""
+    states = graph.get_states()[:size]
+    matrix = graph.get_continuous_chain().generator() if graph.is_continuous() else graph.get_chain().matrix
+    block = matrix.submatrix(np.arange(len(states))).to_dense()
+    return pd.DataFrame(block,index=states,columns=states)
+
+
+def heatmap(df):
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(z=df.values,
+                             x=df.columns,
+                             y=df.index,
+                             colorscale='Viridis'))
+    return fig
+
+
+def render_matrix(graph):
+    """``T`` (or the generator ``Q``) in LaTeX, truncated for big chains, plus the table behind the expander."""
+    n = len(graph.get_states())
+    if graph.is_continuous():
+        st.write("Generador Infinitesimal")
+        symbol,full = "Q",graph.get_generator_df
+    else:
+        st.write("Matriz de Transición")
+        symbol,full = "T",graph.get_transition_matrix_df
+    if n <= LATEX_MAX_STATES:
+        st.latex(symbol+" = "+ memo(graph,("latex",),lambda: matrix_latex(full())))
+    else:
+        st.latex(symbol+" = "+ memo(graph,("latex",),lambda: truncated_latex(matrix_block(graph,LATEX_PREVIEW).values,n)))
+    with st.expander("Ver Matriz con Indicadores"):
+        if n <= TABLE_MAX_STATES:
+            st.write(full())
+            plotly_chart(memo(graph,("heatmap",),lambda: heatmap(full())))
+        else:
+            st.caption(f"La matriz tiene {n} estados; se muestran las primeras {TABLE_MAX_STATES} filas y columnas")
+            st.write(memo(graph,("block",),lambda: matrix_block(graph,TABLE_MAX_STATES)))
+
+
+@profiled(name="plotly_chart")
+def plotly_chart(fig):
+    st.plotly_chart(fig)
+
+
+@st.experimental_fragment
+@profiled(name="render_graph")
+def render_graph(graph, config: dict = None, view=None):
+    config = {"height": 500, "width": 500, "directed": True, "physics": True, "hierarchical": False, **(config or {})}
+    if view is None:
+        nodes, edges = graph.nodes, graph.edges
+    else:
+        nodes, edges = view.agraph_elements()
+        if view.reduced:
+            # the layout was computed server-side; physics on a big view stalls the browser
+            config["physics"] = False
+            st.caption(f"Vista reducida: {len(view.nodes)} nodos"
+                       + (" (clases de comunicación)" if view.collapsed else "")
+                       + f", {view.hidden_edges} aristas ocultas")
+
+    fragment = agraph(nodes, edges, config=Config(**config))
+    st.write(fragment)
+
+
+@st.experimental_dialog("Propiedades De la Cadena de Markov",width="large")
+@profiled(name="render_properties")
+def render_properties(graph):
+    render_matrix(graph)
+    labels = graph.get_states()
+
+    classification = graph.classify()
+    if not graph.is_stochastic():
+        if graph.is_continuous():
+            st.warning("Hay tasas negativas o no numéricas en las filas: "+", ".join(map(str,graph.get_invalid_rows())))
+        else:
+            st.warning("Las filas de la matriz de transición no suman 1: "+", ".join(map(str,graph.get_invalid_rows())))
+    with st.expander("Clases de Comunicación"):
+        classes = classification.classes[:TABLE_MAX_STATES]
+        if len(classification.classes) > TABLE_MAX_STATES:
+            st.caption(f"La cadena tiene {len(classification.classes)} clases; se muestran las primeras {TABLE_MAX_STATES}")
+
+        def members(c):
+            names = ", ".join(labels[i] for i in c[:LATEX_PREVIEW])
+            return names if len(c) <= LATEX_PREVIEW else names+f", … (+{len(c)-LATEX_PREVIEW})"
+
+        st.write(memo(graph,("classes",),lambda: pd.DataFrame({
+            "Estados": [members(c) for c in classes],
+            "Tipo": ["Recurrente" if closed else "Transitoria" for closed in classification.closed[:len(classes)]],
+            "Periodo": classification.periods[:len(classes)],
+        })))
+
+    tabs = st.tabs(["Ergodicidad","Absorción","Irreducibilidad","Regularidad","Aperiodicidad","Distribución Estacionaria"])
+    with tabs[5]:
+        st.subheader("Distribución Estacionaria")
+        st.caption(r"""
+                        Una distribución $\pi$ sobre $E$ es estacionaria si $\pi T = \pi$. Se calcula una
+                        distribución por cada clase cerrada de la cadena
+                    """)
+        method = st.selectbox("Método",["auto","direct","power","iterative"])
+        stationary = graph.stationary_distribution(method=method)
+
+        size = min(len(labels),TABLE_MAX_STATES)
+        n_classes = min(len(stationary.classes),TABLE_MAX_STATES)
+        if len(labels) > TABLE_MAX_STATES or len(stationary.classes) > TABLE_MAX_STATES:
+            st.caption(f"Se muestran los primeros {size} estados y las primeras {n_classes} clases cerradas")
+
+        def build_stationary():
+            sdf = pd.DataFrame({"Clase "+str(k+1): stationary.full(k,size) for k in range(n_classes)},index=labels[:size])
+            fig = go.Figure()
+            for column in sdf.columns[:LATEX_MAX_STATES]:
+                fig.add_trace(go.Bar(x=sdf.index,y=sdf[column],name=column))
+            return sdf,fig
+
+        sdf,fig = memo(graph,("stationary",method),build_stationary)
+        st.write(sdf)
+        solvers = ", ".join(f"{solver} ({count})" for solver,count in Counter(stationary.solvers).items())
+        st.caption(f"Métodos: {solvers} — Iteraciones: {stationary.iterations} — Residuo: {stationary.residual:.3e}")
+        if not stationary.converged:
+            st.warning("La iteración de potencias no alcanzó la tolerancia; la distribución es aproximada")
+        plotly_chart(fig)
+
+    with tabs[4]:
+        st.subheader("Aperiodicidad")
+        st.caption("""Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es aperiódica
+                        si para cada estado $i \in E$, el periodo de $i$ es 1, es decir, si para cada estado
+                        $i \in E$, se cumple que $d(i) = 1$, donde $d(i)$ es el máximo común divisor de los
+                        tiempos de retorno al estado $i$
+                    """)
+        if classification.is_aperiodic:
+            st.success("La cadena es aperiódica")
+        else:
+            st.error("La cadena no es aperiódica")
+
+    with tabs[3]:
+        st.subheader("Regularidad")
+        st.caption("""
+                     Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es regular
+                     si todas sus clases de estados son recurrentes positivas, es decir, si para cada
+                     estado $i \in E,$ se cumple que $\mathbb{P}(T_i < \infty | X_0 = i) = 1$, donde
+                     $T_i$ es el primer tiempo de retorno al estado $i$
+                   """)
+        if classification.is_regular:
+            st.success("La cadena es regular")
+        else:
+            st.error("La cadena no es regular")
+
+        if graph.is_continuous():
+            with st.expander("Distribución Transitoria"):
+                render_transient(graph,labels)
+        else:
+            with st.expander("Logs de Iteraciones"):
+                if len(labels) <= TABLE_MAX_STATES:
+                    iterat = st.slider("Iteración",1,MAX_HORIZON,1)
+                    dflo = graph.get_transition_power(iterat)
+                    st.write(dflo)
+
+                    st.write("Graficas de la matriz de transición")
+                    plotly_chart(memo(graph,("power",iterat),lambda: heatmap(dflo)))
+                else:
+                    st.caption(f"Con {len(labels)} estados no se muestran las potencias completas de T")
+
+                st.write("Grafica de Probabilidades")
+                evente = st.selectbox("Evento",labels)
+                # every horizon comes from one propagation of the initial vector
+                gdf = memo(graph,("n_step",evente),lambda: graph.n_step_distribution(evente,range(MAX_HORIZON+1)))
+                prob = st.slider("T",0,MAX_HORIZON,0)
+
+                def build_n_step():
+                    fig2 = go.Figure()
+                    fig2.add_trace(go.Scatter(x=gdf.columns,
+                                                y=gdf.loc[prob],
+                                                mode="lines+markers"))
+
+                    fig2.update_layout(title="Probabilidad de Transición de "+str(evente) + " a los estados en el tiempo "+str(prob),
+                                      xaxis_title="Estados",
+                                      yaxis_title="Probabilidad")
+                    return fig2
+
+                plotly_chart(memo(graph,("n_step_figure",evente,prob),build_n_step))
+
+                st.write("Tiempo de Primera Pasada")
+                target = st.selectbox("Estado Objetivo",labels)
+
+                def build_passage():
+                    passage = graph.first_passage_distribution(evente,[target],MAX_HORIZON)
+                    fig3 = go.Figure()
+                    fig3.add_trace(go.Bar(x=passage.index,y=passage.values))
+                    fig3.update_layout(title="Probabilidad de llegar por primera vez a "+str(target)+" desde "+str(evente)+" en el tiempo n",
+                                       xaxis_title="n",
+                                       yaxis_title="Probabilidad")
+                    caption = f"$\\mathbb{{P}}(T \\leq {MAX_HORIZON})$ = {passage.sum():.4f}"
+                    if target != evente:
+                        hitting = graph.expected_hitting_times([target])
+                        caption += f" — Tiempo esperado de llegada: {hitting[evente]:.4g}"
+                    return fig3,caption
+
+                fig3,caption = memo(graph,("passage",evente,target),build_passage)
+                plotly_chart(fig3)
+                st.caption(caption)
+
+    with tabs[2]:
+        st.subheader("Irreducibilidad")
+        st.caption("""
+                        Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es irreducible
+                        si para cualquier par de estados $i,j \in E$, existe un entero $n \geq 0$ tal que
+                        $\mathbb{P}(X_n = j | X_0 = i) > 0$
+                    """)
+        if classification.is_irreducible:
+            st.success("La cadena es irreducible")
+        else:
+            st.error("La cadena no es irreducible")
+
+    with tabs[1]:
+        st.subheader("Absorción")
+        st.caption(r"""
+                        Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es absorbente
+                        si existe un subconjunto $A \subset E$ tal que:
+
+1. $A$ es cerrado bajo la matriz de transición $T$
+2. $T_{ii} = 1$ para todo $i \in A$
+3. $T_{ij} = 0$ para todo $i \in A$ y $j \notin A$
+                    """)
+        if classification.is_absorbing:
+            st.success("La cadena es absorbente")
+            with st.expander("Forma Canónica"):
+                if len(labels) <= TABLE_MAX_STATES:
+                    st.write(memo(graph,("canonical",),lambda: graph.get_canonical_form()[0]))
+                else:
+                    st.caption(f"La cadena tiene {len(labels)} estados; se muestran las primeras {TABLE_MAX_STATES} filas y columnas")
+                    st.write(memo(graph,("canonical",),lambda: graph.get_canonical_form(TABLE_MAX_STATES)[0]))
+            if len(labels) > TABLE_MAX_STATES:
+                st.caption(f"Se muestran los primeros {TABLE_MAX_STATES} estados transitorios")
+            if graph.is_continuous():
+                st.write("Tiempo esperado hasta la absorción")
+                st.write(graph.expected_steps_to_absorption().rename("Tiempo").iloc[:TABLE_MAX_STATES])
+            else:
+                st.write("Número esperado de pasos hasta la absorción")
+                st.write(graph.expected_steps_to_absorption().rename("Pasos").iloc[:TABLE_MAX_STATES])
+            st.write("Probabilidades de absorción")
+            st.write(graph.absorption_probabilities().iloc[:TABLE_MAX_STATES,:TABLE_MAX_STATES])
+        else:
+            st.error("La cadena no es absorbente")
+
+    with tabs[0]:
+        st.subheader("Ergodicidad")
+        st.caption("""
+                     Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es ergódica
+                     si es irreducible y aperiódica
+                   """)
+        if classification.is_ergodic:
+            st.success("La cadena es ergódica")
+        else:
+            st.error("La cadena no es ergódica")
+
+
+def render_transient(graph, labels):
+    evente = st.selectbox("Estado Inicial",labels,key="transient_initial")
+    horizon = st.number_input("Tiempo máximo",min_value=0.01,value=10.0,key="transient_horizon")
+    grid = np.linspace(0.0,horizon,MAX_HORIZON+1)
+    # one increasing pass over the grid, each point starts from the previous one
+    tdf = memo(graph,("transient",evente,horizon),lambda: graph.transient_distribution(evente,grid))
+    t = st.select_slider("t",options=tdf.index.tolist(),value=tdf.index[-1],format_func=lambda t: f"{t:.3g}")
+
+    def build_transient():
+        fig = go.Figure()
+        for state in tdf.columns[:LATEX_MAX_STATES]:
+            fig.add_trace(go.Scatter(x=tdf.index,y=tdf[state],mode="lines",name=str(state)))
+        fig.update_layout(title="Probabilidad de estar en cada estado partiendo de "+str(evente),
+                          xaxis_title="t",
+                          yaxis_title="Probabilidad")
+        return fig
+
+    def build_snapshot():
+        fig2 = go.Figure()
+        fig2.add_trace(go.Scatter(x=tdf.columns,y=tdf.loc[t],mode="lines+markers"))
+        fig2.update_layout(title=f"Distribución en el tiempo {t:.3g}",
+                           xaxis_title="Estados",
+                           yaxis_title="Probabilidad")
+        return fig2
+
+    if len(labels) > LATEX_MAX_STATES:
+        st.caption(f"Se grafican los primeros {LATEX_MAX_STATES} estados")
+    plotly_chart(memo(graph,("transient_figure",evente,horizon),build_transient))
+    plotly_chart(memo(graph,("transient_snapshot",evente,horizon,t),build_snapshot))
+
+
+@st.experimental_dialog("Calculo de Expresiones",width="large")
+@profiled(name="render_expression_calculation")
+def render_expression_calculation(graph):
+    st.write("Calculo de Expresiones")
+    render_matrix(graph)
+    labels = graph.get_states()
+
+    if graph.is_continuous():
+        st.caption("En tiempo continuo $T$ es el generador $Q$: las tasas fuera de la diagonal y $-q_i$ en ella")
+    expr = st.text_area("Expresión",value="T**2")
+    exact = st.radio("Evaluación",["Numérica","Exacta"],horizontal=True) == "Exacta"
+    try:
+        symexp,_ = graph.parse_expression(expr)
+    except Exception as e:
+        st.error(f"Expresión inválida: {e}")
+        return
+
+    if st.button("Calcular"):
+        try:
+            result = graph.evaluate_expression(expr,exact=exact)
+        except Exception as e:
+            st.error(f"No se pudo evaluar la expresión: {e}")
+            return
+        if exact or np.ndim(result) < 2:
+            st.latex(sp.latex(symexp)+" = "+sp.latex(result))
+        else:
+            st.latex(sp.latex(symexp)+" =")
+            st.write(pd.DataFrame(result,index=labels,columns=labels))
+
+
+@st.experimental_dialog("Simulación de la Cadena de Markov",width="large")
+@profiled(name="render_simulation")
+def render_simulation(graph):
+    st.write("Simulación de la Cadena de Markov")
+    render_matrix(graph)
+
+    labels = graph.get_states()
+    if graph.is_continuous():
+        render_continuous_simulation(graph,labels)
+        return
+    initial_state = st.selectbox("Estado Inicial",labels)
+    steps = st.number_input("Pasos",min_value=1,max_value=10**8,value=10,step=1)
+    seed = st.number_input("Semilla",min_value=0,value=None,step=1,help="Deja vacío para una simulación aleatoria")
+    sampler = st.selectbox("Muestreador",["cumulative","alias"])
+
+    def build_simulation():
+        path = None
+        if steps <= 1000:
+            path = graph.simulate_batch(initial_state,steps,seed=seed,sampler=sampler)[0]
+            statistics = OnlineStatistics(graph.get_sampler(sampler),stationary=graph.stationary_distribution().distribution)
+            statistics.update(path)
+        else:
+            # long runs are streamed; only the aggregated counts reach the browser
+            statistics = graph.simulate_statistics(initial_state,steps,seed=seed,sampler=sampler)
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=labels,y=statistics.visits))
+        fig2 = None
+        if len(statistics.tv_history) > 1:
+            steps_axis,distances = zip(*statistics.tv_history)
+            fig2 = go.Figure()
+            fig2.add_trace(go.Scatter(x=steps_axis,y=distances,mode="lines"))
+            fig2.update_layout(xaxis_title="Pasos",yaxis_title="Distancia")
+        return path,statistics,fig,fig2
+
+    if seed is None:
+        path,statistics,fig,fig2 = build_simulation()
+    else:
+        # a seeded run is reproducible, so reruns can reuse it
+        path,statistics,fig,fig2 = memo(graph,("simulation",initial_state,steps,seed,sampler),build_simulation)
+
+    if path is not None:
+        st.write("Estados")
+        st.write([labels[i] for i in path])
+
+    st.write("Histograma de Estados")
+    plotly_chart(fig)
+
+    if statistics.tv_history:
+        st.write("Distancia de variación total a la distribución estacionaria")
+        st.metric("Distancia",f"{statistics.total_variation():.4f}")
+        if fig2 is not None:
+            plotly_chart(fig2)
+
+
+
+def render_continuous_simulation(graph, labels):
+    initial_state = st.selectbox("Estado Inicial",labels)
+    horizon = st.number_input("Tiempo",min_value=0.01,value=10.0)
+    paths = st.number_input("Trayectorias",min_value=1,max_value=10**6,value=1000,step=1)
+    seed = st.number_input("Semilla",min_value=0,value=None,step=1,help="Deja vacío para una simulación aleatoria")
+    sampler = st.selectbox("Muestreador",["cumulative","alias"])
+
+    def build_simulation():
+        times,path = graph.simulate_trajectory(initial_state,horizon,seed=seed,sampler=sampler)
+        fig = go.Figure()
+        # the chain stays in each state until the next jump
+        fig.add_trace(go.Scatter(x=list(times)+[horizon],y=[str(state) for state in path+path[-1:]],
+                                 mode="lines",line_shape="hv"))
+        fig.update_layout(xaxis_title="t",yaxis_title="Estado")
+
+        result = graph.simulate_continuous(initial_state,horizon,paths=paths,seed=seed,sampler=sampler)
+        fig2 = go.Figure()
+        fig2.add_trace(go.Bar(x=labels,y=result.occupancy_distribution))
+        fig2.update_layout(xaxis_title="Estados",yaxis_title="Fracción del tiempo")
+
+        exact = graph.transient_distribution(initial_state,horizon)
+        fig3 = go.Figure()
+        fig3.add_trace(go.Bar(x=labels,y=result.final_distribution,name="Simulada"))
+        fig3.add_trace(go.Bar(x=labels,y=exact.values,name="Exacta"))
+        fig3.update_layout(barmode="group",xaxis_title="Estados",yaxis_title="Probabilidad")
+        return len(path)-1,fig,fig2,fig3
+
+    if seed is None:
+        jumps,fig,fig2,fig3 = build_simulation()
+    else:
+        jumps,fig,fig2,fig3 = memo(graph,("continuous_simulation",initial_state,horizon,paths,seed,sampler),build_simulation)
+
+    st.write(f"Trayectoria ({jumps} saltos)")
+    plotly_chart(fig)
+    st.write("Fracción del tiempo en cada estado")
+    plotly_chart(fig2)
+    st.write(f"Distribución en el tiempo {horizon:g}")
+    plotly_chart(fig3)
+
+def render_profile():
+    """Debug panel with what :mod:`components.profiling` recorded so far."""
+    data = report()
+    cols = st.columns([0.8,0.2])
+    cols[0].caption("Tiempos acumulados desde el último reinicio; propio = sin contar llamadas anidadas")
+    if cols[1].button("Reiniciar",key="profile_reset"):
+        reset()
+        data = report()
+    if not data["methods"]:
+        st.info("Aún no hay mediciones")
+        return
+    methods = pd.DataFrame(data["methods"]).rename(columns={"name":"Método","calls":"Llamadas","total_s":"Total (s)",
+                                                             "self_s":"Propio (s)","max_s":"Máximo (s)","mean_s":"Media (s)",
+                                                             "shape":"Forma","nnz":"No nulos"})
+    methods["Forma"] = methods["Forma"].map(lambda shape: "" if shape is None else " x ".join(map(str,shape)))
+    st.dataframe(methods,hide_index=True,use_container_width=True)
+    if data["caches"]:
+        caches = pd.DataFrame(data["caches"]).rename(columns={"name":"Caché","hits":"Aciertos","misses":"Fallos",
+                                                               "hit_rate":"Tasa de aciertos"})
+        st.dataframe(caches,hide_index=True,use_container_width=True)
+    st.download_button("Descargar reporte",data=json.dumps(data,default=str),file_name="perfil.json",
+                       mime="application/json",key="profile_download")
@@ -0,0 +1,231 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from .matrix import SparseTransitionMatrix
+
+
+def row_support(matrix):
+    """Return the positive entries of ``matrix`` as ``(indptr, indices, data)``.
+
+    ``matrix`` is a dense array or a :class:`SparseTransitionMatrix`; the
+    sparse one is never densified. Rows without any outgoing probability
+    get a self loop so every state has somewhere to go; they behave as
+    absorbing states when sampled.
+    """
+    if isinstance(matrix, SparseTransitionMatrix):
+        n = matrix.n_states
+        positive = matrix.data > 0
+        rows, cols, data = matrix.rows[positive], matrix.indices[positive], matrix.data[positive]
+    else:
+        matrix = np.asarray(matrix, dtype="float64")
+        n = matrix.shape[0]
+        rows, cols = np.nonzero(matrix > 0)
+        data = matrix[rows, cols]
+
+    empty = np.flatnonzero(np.bincount(rows, minlength=n) == 0)
+    if len(empty) > 0:
+        rows = np.concatenate([rows, empty])
+        cols = np.concatenate([cols, empty])
+        data = np.concatenate([data, np.ones(len(empty))])
+        order = np.argsort(rows, kind="stable")
+        rows, cols, data = rows[order], cols[order], data[order]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols.astype(np.int32), data
+
+
+class CumulativeSampler:
+    """Inverse-CDF sampler over precomputed cumulative rows.
+
+    The cumulative probabilities of every row are shifted by the row index
+    and stored in one increasing array, so a single ``searchsorted`` call
+    draws the next state for all paths at once.
+    """
+
+    def __init__(self, indptr, indices, data):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype="float64")
+
+        counts = np.diff(self.indptr)
+        starts = self.indptr[:-1]
+        rows = np.repeat(np.arange(len(counts)), counts)
+
+        running = np.cumsum(data)
+        offsets = np.repeat(running[starts] - data[starts], counts)
+        totals = np.repeat(running[self.indptr[1:] - 1] - running[starts] + data[starts], counts)
+        cumulative = (running - offsets) / totals
+        cumulative[self.indptr[1:] - 1] = 1.0
+        self.keys = rows + cumulative
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        return cls(*row_support(matrix))
+
+    ARRAYS = ("indptr", "indices", "keys")
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        # rebuild around existing (e.g. shared-memory) buffers without copying
+        sampler = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(sampler, name, arrays[name])
+        return sampler
+
+    @property
+    def n_states(self):
+        return len(self.indptr) - 1
+
+    def draw_slots(self, states, rng):
+        u = rng.random(len(states))
+        slots = np.searchsorted(self.keys, states + u, side="right")
+        # s + u can round up to s + 1 and land in the next row
+        return np.minimum(slots, self.indptr[states + 1] - 1)
+
+    def step(self, states, rng):
+        return self.indices[self.draw_slots(states, rng)]
+
+    def walk(self, state, count, rng):
+        """The next ``count`` states of a single path starting after ``state``.
+
+        A scalar loop over plain lists: one path can't be vectorized across
+        steps, and per-step NumPy calls would dominate.
+        """
+        if getattr(self, "_lists", None) is None:
+            self._lists = (self.keys.tolist(), self.indices.tolist(), self.indptr.tolist())
+        keys, indices, indptr = self._lists
+        out = [0] * count
+        state = int(state)
+        for i, u in enumerate(rng.random(count).tolist()):
+            slot = bisect_right(keys, state + u)
+            last = indptr[state + 1] - 1
+            state = indices[slot if slot < last else last]
+            out[i] = state
+        return np.array(out, dtype=np.int32)
+
+
+class AliasSampler:
+    """Walker/Vose alias sampler with O(1) draws per step.
+
+    One alias table is built per row over the row's support; ``prob`` and
+    ``alias`` are indexed by slot, like ``indices``.
+    """
+
+    def __init__(self, indptr, indices, data):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype="float64")
+
+        self.counts = np.diff(self.indptr)
+        self.prob = np.ones(len(data), dtype="float64")
+        self.alias = np.arange(len(data), dtype=np.int64)
+        for row in range(len(self.counts)):
+            start, stop = self.indptr[row], self.indptr[row + 1]
+            self._build_row(start, data[start:stop])
+
+    def _build_row(self, start, weights):
+        k = len(weights)
+        scaled = (weights * (k / weights.sum())).tolist()
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        prob = [1.0] * k
+        alias = list(range(k))
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # whatever is left over is 1 up to rounding error and keeps prob = 1
+        self.prob[start:start + k] = prob
+        self.alias[start:start + k] = alias
+        self.alias[start:start + k] += start
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        return cls(*row_support(matrix))
+
+    ARRAYS = ("indptr", "indices", "counts", "prob", "alias")
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        sampler = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(sampler, name, arrays[name])
+        return sampler
+
+    @property
+    def n_states(self):
+        return len(self.indptr) - 1
+
+    def draw_slots(self, states, rng):
+        counts = self.counts[states]
+        column = np.minimum((rng.random(len(states)) * counts).astype(np.int64), counts - 1)
+        slots = self.indptr[states] + column
+        keep = rng.random(len(states)) < self.prob[slots]
+        return np.where(keep, slots, self.alias[slots])
+
+    def step(self, states, rng):
+        return self.indices[self.draw_slots(states, rng)]
+
+    def walk(self, state, count, rng):
+        """The next ``count`` states of a single path starting after ``state``."""
+        if getattr(self, "_lists", None) is None:
+            self._lists = (self.indptr.tolist(), self.counts.tolist(), self.prob.tolist(),
+                           self.alias.tolist(), self.indices.tolist())
+        indptr, counts, prob, alias, indices = self._lists
+        u = rng.random(2 * count).tolist()
+        out = [0] * count
+        state = int(state)
+        for i in range(count):
+            k = counts[state]
+            column = int(u[2 * i] * k)
+            slot = indptr[state] + (column if column < k else k - 1)
+            if u[2 * i + 1] >= prob[slot]:
+                slot = alias[slot]
+            state = indices[slot]
+            out[i] = state
+        return np.array(out, dtype=np.int32)
+
+
+SAMPLERS = {
+    "cumulative": CumulativeSampler,
+    "alias": AliasSampler,
+}
+
+
+def make_sampler(matrix, sampler="cumulative"):
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler {sampler!r}, expected one of {sorted(SAMPLERS)}")
+    return SAMPLERS[sampler].from_matrix(matrix)
+
+
+def simulate_paths(sampler, initial, steps, paths=1, rng=None):
+    """Advance ``paths`` trajectories of ``steps`` states together.
+
+    ``initial`` is a state index or one index per path. Returns an ``int32``
+    array of shape ``(paths, steps)`` whose first column is the initial state.
+    """
+    rng = np.random.default_rng(rng)
+    out = np.empty((paths, steps), dtype=np.int32)
+    if steps == 0:
+        return out
+
+    current = np.broadcast_to(np.asarray(initial, dtype=np.int64), (paths,)).copy()
+    out[:, 0] = current
+    for t in range(1, steps):
+        current = sampler.step(current, rng)
+        out[:, t] = current
+    return out
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .matrix import SparseTransitionMatrix, use_sparse, vecmat
+
+# closed classes up to this size are solved directly with a dense factorization
+DIRECT_MAX_STATES = 1000
+# BiCGSTAB either converges in a few hundred iterations or has stalled; this
+# cap is separate from max_iter, which bounds power iteration
+KRYLOV_MAX_ITER = 1000
+
+METHODS = ("auto", "direct", "power", "iterative")
+
+
+@dataclass(frozen=True)
+class StationaryResult:
+    """Stationary distributions of a chain, one per closed class.
+
+    ``vectors[k]`` is the stationary vector of the closed class whose states
+    are ``classes[k]`` and ``solvers[k]`` the solver that produced it:
+    ``"trivial"`` (a single state), ``"direct"``, ``"iterative"``,
+    ``"power"`` or ``"iterative+direct"`` when BiCGSTAB stalled and
+    ``"auto"`` fell back to a sparse LU solve. ``method`` is the one
+    requested. ``iterations`` and ``residual`` (the largest
+    ``||pi P - pi||_1``) are reported over all classes; ``converged`` is
+    False when power iteration ran out of iterations before reaching ``tol``.
+    """
+
+    vectors: list
+    classes: list
+    n_states: int
+    method: str
+    solvers: list
+    iterations: int
+    residual: float
+    converged: bool = True
+
+    @property
+    def is_unique(self):
+        return len(self.classes) == 1
+
+    def full(self, k, size=None):
+        """Stationary vector of closed class ``k`` over all states, or over the first ``size``."""
+        if size is None or size >= self.n_states:
+            pi = np.zeros(self.n_states)
+            pi[self.classes[k]] = self.vectors[k]
+            return pi
+        members = np.asarray(self.classes[k])
+        keep = members < size
+        pi = np.zeros(size)
+        pi[members[keep]] = np.asarray(self.vectors[k])[keep]
+        return pi
+
+    @property
+    def distribution(self):
+        # only defined when the chain has a single closed class
+        return self.full(0) if self.is_unique else None
+
+
+def _restrict(matrix, states):
+    if isinstance(matrix, SparseTransitionMatrix):
+        return matrix.submatrix(states)
+    return np.asarray(matrix, dtype="float64")[np.ix_(states, states)]
+
+
+def _residual(matrix, pi):
+    return float(np.abs(vecmat(matrix, pi) - pi).sum())
+
+
+def _normalize(pi):
+    pi = np.clip(pi, 0.0, None)
+    return pi / pi.sum()
+
+
+def solve_direct(matrix):
+    """Solve ``pi (P - I) = 0`` with ``sum(pi) = 1`` by one LU solve, sparse when the class is."""
+    if isinstance(matrix, SparseTransitionMatrix):
+        if use_sparse(matrix.n_states, matrix.nnz):
+            return _solve_sparse_direct(matrix), 1
+        matrix = matrix.to_dense()
+    n = matrix.shape[0]
+    system = matrix.T - np.eye(n)
+    system[-1, :] = 1.0
+    rhs = np.zeros(n)
+    rhs[-1] = 1.0
+    return _normalize(np.linalg.solve(system, rhs)), 1
+
+
+def _solve_sparse_direct(matrix):
+    from scipy import sparse
+    from scipy.sparse import linalg
+
+    # fixing pi[-1] = 1 leaves (P - I)^T without its last row and column,
+    # which is non-singular on a closed class and keeps the sparsity
+    system = (matrix.to_scipy().T - sparse.identity(matrix.n_states)).tocsc()
+    x = linalg.splu(system[:-1, :-1].tocsc()).solve(-system[:-1, -1].toarray().ravel())
+    return _normalize(np.append(x, 1.0))
+
+
+def solve_power(matrix, tol=1e-12, max_iter=100000, x0=None, lazy=False):
+    """Power iteration on a row vector, O(nnz) per iteration.
+
+    ``lazy`` iterates ``(P + I) / 2`` instead, which has the same stationary
+    vector but also converges for periodic classes. Returns the vector, the
+    iterations run and whether the last step fell below ``tol``.
+    """
+    n = matrix.shape[0]
+    if x0 is not None and np.sum(x0) > 0:
+        pi = _normalize(np.asarray(x0, dtype="float64"))
+    else:
+        pi = np.full(n, 1.0 / n)
+    for iteration in range(1, max_iter + 1):
+        nxt = vecmat(matrix, pi)
+        if lazy:
+            nxt = 0.5 * (nxt + pi)
+        if np.abs(nxt - pi).sum() <= tol:
+            return _normalize(nxt), iteration, True
+        pi = nxt
+    return _normalize(pi), max_iter, False
+
+
+def solve_iterative(matrix, tol=1e-12, max_iter=KRYLOV_MAX_ITER, x0=None):
+    """Sparse Krylov solve (BiCGSTAB) of the normalized system ``pi (P - I) = 0``.
+
+    Returns ``None`` as the vector when the solver does not converge.
+    """
+    from scipy import sparse
+    from scipy.sparse import linalg
+
+    if not isinstance(matrix, SparseTransitionMatrix):
+        matrix = SparseTransitionMatrix.from_dense(matrix)
+    n = matrix.n_states
+    system = (matrix.to_scipy().T - sparse.identity(n, format="csr")).tolil()
+    system[n - 1, :] = np.ones(n)
+    rhs = np.zeros(n)
+    rhs[-1] = 1.0
+
+    iterations = [0]
+
+    def count(_):
+        iterations[0] += 1
+
+    if x0 is None or np.sum(x0) <= 0:
+        x0 = np.full(n, 1.0 / n)
+    pi, info = linalg.bicgstab(system.tocsr(), rhs, x0=x0, rtol=tol, maxiter=max_iter, callback=count)
+    if info != 0:
+        return None, iterations[0]
+    return _normalize(pi), iterations[0]
+
+
+def stationary_distribution(matrix, classification, method="auto", tol=1e-12, max_iter=100000, x0=None):
+    """Stationary distribution of every closed class of the chain.
+
+    ``method`` is ``"direct"``, ``"power"``, ``"iterative"`` or ``"auto"``,
+    which solves small classes directly and large ones iteratively, falling
+    back to a sparse LU solve if the Krylov solver stalls. BiCGSTAB is
+    capped at ``KRYLOV_MAX_ITER`` iterations, ``max_iter`` bounds power
+    iteration only. ``x0`` is an optional full-length warm start.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+
+    closed = np.flatnonzero(classification.closed)
+    vectors = []
+    classes = []
+    solvers = []
+    total_iterations = 0
+    residual = 0.0
+    converged = True
+    for k in closed:
+        states = classification.classes[k]
+        classes.append(states)
+        if len(states) == 1:
+            vectors.append(np.ones(1))
+            solvers.append("trivial")
+            continue
+
+        sub = _restrict(matrix, states)
+        start = None if x0 is None else np.asarray(x0, dtype="float64")[states]
+        chosen = method
+        if method == "auto":
+            chosen = "direct" if len(states) <= DIRECT_MAX_STATES else "iterative"
+
+        if chosen == "direct":
+            pi, iterations = solve_direct(sub)
+        elif chosen == "iterative":
+            pi, iterations = solve_iterative(sub, tol=tol, x0=start)
+            if pi is None and method == "auto":
+                pi, extra = solve_direct(sub)
+                iterations += extra
+                chosen = "iterative+direct"
+            elif pi is None:
+                raise RuntimeError(f"BiCGSTAB did not converge in {KRYLOV_MAX_ITER} iterations")
+        else:
+            pi, iterations, done = solve_power(sub, tol=tol, max_iter=max_iter, x0=start,
+                                               lazy=classification.periods[k] != 1)
+            converged &= done
+
+        vectors.append(pi)
+        solvers.append(chosen)
+        total_iterations += iterations
+        residual = max(residual, _residual(sub, pi))
+
+    return StationaryResult(
+        vectors=vectors,
+        classes=classes,
+        n_states=matrix.shape[0],
+        method=method,
+        solvers=solvers,
+        iterations=total_iterations,
+        residual=residual,
+        converged=converged,
+    )
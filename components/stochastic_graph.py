@@ -1,274 +1,632 @@
+import io
+
 import numpy as np
-import pandas as pd
-import streamlit as st
-import sympy as sp
-from plotly import graph_objects as go
 
-from .graph import Graph
+from .chain import MarkovChain
+from .ctmc import ContinuousChain
+from .graph import Graph, edge_dict, node_dict
+from .layout import (LAYOUT_SCALE, MAX_VISIBLE_EDGES, MAX_VISIBLE_NODES, GraphView, aggregate_edges,
+                     select_edges, spring_layout)
+from .matrix import SparseTransitionMatrix
+from .profiling import PROFILER, profiled
+from .streaming import BLOCK_SIZE
+
+
+# |row sum - 1| allowed for a row to count as stochastic
+ROW_TOLERANCE = 1e-9
+# edge labels are probabilities of one step, or rates in continuous time
+DISCRETE = "discrete"
+CONTINUOUS = "continuous"
+KINDS = (DISCRETE, CONTINUOUS)
+
 
-x='''def is_ergodic_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values > 0)
-    
-    def is_absorbing_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values >= 0)
-    
-    def is_irreducible_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values > 0)
-    
-    '''
-    
 class StochasticGraph(Graph):
     def __init__(self, nodes: list = None, edges: list = None):
+        self._version = 0
+        self._cache = {}
+        self._cache_version = 0
+        self._chain = None
+        self._chain_version = -1
+        # edge edits since the chain was built, (source, target) -> probability
+        # or None when removed; None itself means the chain must be rebuilt
+        self._pending = None
+        # finite row sums and counts of non-numeric labels by interned key, and
+        # the states whose row isn't stochastic, built on first use and then
+        # kept up to date one edit at a time
+        self._row_sums = None
+        self._row_nans = None
+        self._invalid_rows = None
+        self.kind = DISCRETE
         super().__init__(nodes, edges)
 
     @property
-    def nodes(self):
-        return self._nodes
-    
-    @nodes.setter
-    def nodes(self, nodes):
-        self._nodes = nodes
-    
-    @property
-    def edges(self):
-        return self._edges
-    
-    @edges.setter
-    def edges(self, edges):
-        self._edges = edges
+    def version(self):
+        return self._version
+
+    def _touch(self, changed=None):
+        self._version += 1
+        # anything but an edit between two existing nodes may reorder the
+        # states, so only those are patched into the chain and row sums
+        if changed is None or any(source not in self._node_attributes or target not in self._node_attributes
+                                  for source, target, _, _ in changed):
+            self._pending = None
+            self._row_sums = self._row_nans = self._invalid_rows = None
+            return
+        for source, target, old, new in changed:
+            if self._pending is not None:
+                self._pending[(source, target)] = new
+            if self._row_sums is not None:
+                # a NaN would stick in a running sum, so it is counted instead
+                for value, sign in ((new, 1), (old, -1)):
+                    if value is None:
+                        continue
+                    if np.isfinite(value):
+                        self._row_sums[source] += sign * value
+                    else:
+                        self._row_nans[source] += sign
+                self._check_row(source)
+
+    def _header(self):
+        return {"kind": self.kind}
+
+    def _load_header(self, header):
+        kind = header.get("kind", DISCRETE)
+        if kind not in KINDS:
+            raise ValueError(f"unknown chain kind: {kind!r}")
+        self.kind = kind
+
+    def set_kind(self, kind):
+        """Read the edge labels as probabilities (``"discrete"``) or rates (``"continuous"``)."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown chain kind: {kind!r}")
+        if kind != self.kind:
+            self.kind = kind
+            self._touch()
+
+    def is_continuous(self):
+        return self.kind == CONTINUOUS
+
+    def _check_row(self, key):
+        if self._row_nans[key] == 0 and abs(self._row_sums[key] - 1.0) <= ROW_TOLERANCE:
+            self._invalid_rows.discard(key)
+        else:
+            self._invalid_rows.add(key)
+
+    @profiled
+    def _build_row_sums(self):
+        keys, _ = self._state_positions()
+        matrix = self.get_chain().matrix
+        finite = np.isfinite(matrix.data)
+        self._row_sums = np.zeros(len(self._ids))
+        self._row_sums[keys] = np.bincount(matrix.rows, weights=np.where(finite, matrix.data, 0.0), minlength=len(keys))
+        self._row_nans = np.zeros(len(self._ids), dtype=np.int64)
+        self._row_nans[keys] = np.bincount(matrix.rows[~finite], minlength=len(keys))
+        valid = (self._row_nans[keys] == 0) & (np.abs(self._row_sums[keys] - 1.0) <= ROW_TOLERANCE)
+        self._invalid_rows = set(keys[~valid].tolist())
+
+    def get_invalid_rows(self):
+        """States whose outgoing probabilities don't sum to 1, in O(edited rows) after the first call.
+
+        In a continuous chain, the states with a negative or non-numeric rate.
+        """
+        if self.is_continuous():
+            chain = self.get_continuous_chain()
+            return [chain.states[i] for i in chain.invalid_rows()]
+        if self._row_sums is None:
+            self._build_row_sums()
+        index = self.get_state_index()
+        return sorted(self.ids(self._invalid_rows), key=index.__getitem__)
+
+    def is_stochastic(self):
+        if self.is_continuous():
+            return len(self.get_continuous_chain().invalid_rows()) == 0
+        if self._row_sums is None:
+            self._build_row_sums()
+        return not self._invalid_rows
+
+    def _cached(self, key, build):
+        # everything derived from the graph is memoized against the version,
+        # so reruns that don't mutate the graph never rebuild it
+        if self._cache_version != self._version:
+            self._cache.clear()
+            self._cache_version = self._version
+        if PROFILER.enabled:
+            PROFILER.cache("StochasticGraph." + str(key[0] if isinstance(key, tuple) else key), key in self._cache)
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def cached(self, key, build):
+        """``build()`` memoized under ``key`` until the graph changes, for callers outside the package."""
+        return self._cached(("external", key), build)
+
+    def get_json_payload(self):
+        """``iter_json()`` joined into one string, built once per graph version."""
+        return self._cached("json_payload", lambda: "".join(self.iter_json()))
+
+    def get_npz_payload(self):
+        """The bytes of ``save_npz``, built once per graph version."""
+        def build():
+            buffer = io.BytesIO()
+            self.save_npz(buffer)
+            return buffer.getvalue()
+        return self._cached("npz_payload", build)
 
     def get_transition_matrix(self):
-        matrix = {}
-        for node in self.nodes:
-            matrix[node.id] = {}
-            for edge in self.edges:
-                if edge.source == node.id:
-                    matrix[node.id][edge.to] = float(edge.label)
-
-        return matrix
+        """``{state: {target: probability}}``; a fresh copy, the cached one is never handed out."""
+        matrix = self._cached("transition_dict", self._build_transition_matrix)
+        return {state: dict(row) for state, row in matrix.items()}
+
+    @profiled
+    def _build_transition_matrix(self):
+        matrix = {key: {} for key in self._node_ids}
+        for source, target, probability in zip(self._sources, self._targets, self._probabilities):
+            if source in matrix:
+                matrix[source][self._ids[target]] = probability
+        return {self._ids[key]: row for key, row in matrix.items()}
     
     
     def get_transition_matrix_df(self):
-        tm = self.get_transition_matrix()
-        tdf = pd.DataFrame(tm).T.fillna(0)
-        return tdf
+        # a writable copy: the cached frame wraps the chain's read-only matrix
+        return self._cached("transition_df", self._build_transition_matrix_df).copy()
+
+    @profiled
+    def _build_transition_matrix_df(self):
+        import pandas as pd
+        states = self.get_states()
+        return pd.DataFrame(self.get_integer_transition_matrix(),index=states,columns=states)
     
     def get_numpy_transition_matrix(self):
-        tdf = self.get_transition_matrix_df()
-        return tdf.to_numpy(dtype="float64")
-    
-    @st.experimental_dialog("Propiedades De la Cadena de Markov",width="large")
-    def render_properties(self):
-        tdf = self.get_transition_matrix_df()
-        st.write("Matriz de Transición")
-        st.latex("T = "+ sp.latex(sp.Matrix(tdf.to_numpy())))
-        with st.expander("Ver Matriz con Indicadores"):
-            st.write(tdf)
-        
-        
-        
-        tabs = st.tabs(["Ergodicidad","Absorción","Irreducibilidad","Regularidad","Aperiodicidad"])
-        with tabs[4]:
-            st.subheader("Aperiodicidad")
-            st.caption("""Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es aperiódica
-                            si para cada estado $i \in E$, el periodo de $i$ es 1, es decir, si para cada estado
-                            $i \in E$, se cumple que $d(i) = 1$, donde $d(i)$ es el máximo común divisor de los
-                            tiempos de retorno al estado $i$
-                        """)
-            is_aperiodic = self.is_aperiodic_chain()
-            if is_aperiodic:
-                st.success("La cadena es aperiódica")
-            else:
-                st.error("La cadena no es aperiódica")
-                
-        with tabs[3]:
-            st.subheader("Regularidad")
-            st.caption("""
-                         Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es regular
-                         si todas sus clases de estados son recurrentes positivas, es decir, si para cada
-                         estado $i \in E,$ se cumple que $\mathbb{P}(T_i < \infty | X_0 = i) = 1$, donde
-                         $T_i$ es el primer tiempo de retorno al estado $i$
-                       """)
-            is_regular,logs = self.is_regular_chain()
-
-            if is_regular:
-                st.success("La cadena es regular")
-            else:
-                st.error("La cadena no es regular o no se ha alcanzado el límite de iteraciones necesarias")
-        
-            with st.expander("Logs de Iteraciones"):
-                iterat = st.slider("Iteración",0,len(logs)-1,0)
-                dflo = pd.DataFrame(logs[iterat],index=tdf.index,columns=tdf.columns)
-                st.write(dflo)
-                
-                st.write("Graficas de la matriz de transición")
-                
-                fig = go.Figure()
-                fig.add_trace(go.Heatmap(z=dflo.values,
-                                         x=dflo.columns,
-                                         y=dflo.index,
-                                         colorscale='Viridis'))
-                st.plotly_chart(fig)
-                
-                st.write("Grafica de Probabilidades")
-                evente = st.selectbox("Evento",list(tdf.columns))
-                prob = st.slider("T",0,len(logs)-1,0)
-                
-                gdf = pd.DataFrame(logs[prob],index=tdf.index,columns=tdf.columns)
-                fig2 = go.Figure()
-                fig2.add_trace(go.Scatter(x=gdf.index,
-                                            y=gdf[evente],
-                                            mode="lines+markers"))
-                
-                fig2.update_layout(title="Probabilidad de Transición de "+evente + " a los estados en el tiempo "+str(prob),
-                                  xaxis_title="Estados",
-                                  yaxis_title="Probabilidad")
-                st.plotly_chart(fig2)
-                
-        with tabs[2]:
-            st.subheader("Irreducibilidad")
-            st.caption("""
-                            Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es irreducible
-                            si para cualquier par de estados $i,j \in E$, existe un entero $n \geq 0$ tal que
-                            $\mathbb{P}(X_n = j | X_0 = i) > 0$
-                        """)
-            is_irreducible = self.is_irreducible_chain()
-            if is_irreducible:
-                st.success("La cadena es irreducible")
-            else:
-                st.error("La cadena no es irreducible")
-                
-        with tabs[1]:
-            st.subheader("Absorción")
-            st.caption(r"""
-                            Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es absorbente
-                            si existe un subconjunto $A \subset E$ tal que:
-                            
-1. $A$ es cerrado bajo la matriz de transición $T$
-2. $T_{ii} = 1$ para todo $i \in A$
-3. $T_{ij} = 0$ para todo $i \in A$ y $j \notin A$
-                        """)
-            is_absorbing = self.is_absorbing_chain()
-            if is_absorbing:
-                st.success("La cadena es absorbente")
+        return self.get_integer_transition_matrix().copy()
+
+    def get_states(self):
+        return self.get_chain().states
+
+    def _state_positions(self):
+        return self._cached("state_positions", self._build_state_positions)
+
+    def _build_state_positions(self):
+        # interned keys in state order (nodes, then edge endpoints that aren't
+        # nodes by first appearance) and the inverse key -> state index map
+        sources, targets = self.edge_columns()
+        endpoints = np.column_stack([sources, targets]).ravel()
+        is_node = np.zeros(len(self._ids), dtype=bool)
+        is_node[self._node_ids] = True
+        extra = endpoints[~is_node[endpoints]]
+        _, first = np.unique(extra, return_index=True)
+        keys = np.concatenate([np.asarray(self._node_ids, dtype=np.int64), extra[np.sort(first)]])
+        position = np.full(len(self._ids), -1, dtype=np.int64)
+        position[keys] = np.arange(len(keys))
+        return keys, position
+
+    def get_state_index(self):
+        return self.get_chain().index
+
+    def get_chain(self):
+        """The headless :class:`MarkovChain` for the current version of the graph.
+
+        After edge edits between existing nodes the previous chain is patched
+        row by row (see :meth:`MarkovChain.with_rows`) instead of rebuilt.
+        """
+        if self.is_continuous():
+            # the uniformized chain: same classes and stationary vectors
+            return self.get_continuous_chain().uniformized()
+        if PROFILER.enabled:
+            PROFILER.cache("StochasticGraph.chain", self._chain_version == self._version)
+        if self._chain_version != self._version:
+            if self._chain is not None and self._pending is not None:
+                self._chain = self._patch_chain()
             else:
-                st.error("La cadena no es absorbente")
-        
-        with tabs[0]:
-            is_ergodic = self.is_ergodic_chain()
-            st.subheader("Ergodicidad")
-            st.caption("""
-                         Una cadena de Markov $\{X_n\}$ con espacio de estados $E$ se dice que es ergódica
-                         si es irreducible y aperiódica
-                       """)
-            if is_ergodic:
-                st.success("La cadena es ergódica")
+                self._chain = self._build_chain()
+            self._chain_version = self._version
+            self._pending = {}
+        return self._chain
+
+    @profiled
+    def _patch_chain(self):
+        index = self._chain.index
+        changes = {}
+        for (source, target), probability in self._pending.items():
+            changes.setdefault(index[self._ids[source]], {})[index[self._ids[target]]] = probability
+        return self._chain.with_rows(changes, tol=ROW_TOLERANCE)
+
+    @profiled
+    def _build_chain(self):
+        keys, position = self._state_positions()
+        sources, targets = self.edge_columns()
+        states = self.ids(keys.tolist())
+        matrix = SparseTransitionMatrix.from_coo(len(states), position[sources], position[targets],
+                                                 self.edge_probabilities())
+        return MarkovChain(states, matrix)
+
+    def get_continuous_chain(self):
+        """The :class:`ContinuousChain` read from the edge labels as rates, cached per version."""
+        return self._cached("continuous_chain", self._build_continuous_chain)
+
+    @profiled
+    def _build_continuous_chain(self):
+        keys, position = self._state_positions()
+        sources, targets = self.edge_columns()
+        return ContinuousChain.from_edges(self.ids(keys.tolist()), position[sources], position[targets],
+                                          self.edge_probabilities())
+
+    def get_generator_df(self):
+        import pandas as pd
+        states = self.get_states()
+        return self._cached("generator_df", lambda: pd.DataFrame(self.get_continuous_chain().dense_generator(),
+                                                                 index=states, columns=states)).copy()
+
+    def get_integer_transition_matrix(self):
+        return self.get_chain().dense()
+
+    def get_sparse_transition_matrix(self):
+        return self.get_chain().matrix
+
+    def is_sparse(self):
+        return self.get_chain().is_sparse()
+
+    def get_analysis_matrix(self):
+        return self.get_chain().analysis_matrix()
+
+    def get_sampler(self, sampler="cumulative"):
+        return self.get_chain().sampler(sampler)
+
+    def get_reachable_states(self, state):
+        chain = self.get_chain()
+        return [chain.states[i] for i in chain.reachable(chain.index[state])]
+    
+    def get_view(self, max_nodes=MAX_VISIBLE_NODES, max_edges=MAX_VISIBLE_EDGES, threshold=0.0):
+        """Level-of-detail :class:`GraphView` with its layout, cached per graph version.
+
+        Up to ``max_nodes`` states are drawn one by one; bigger chains are
+        drawn as their communicating classes, or, when they are a single
+        class, as the ``max_nodes`` states receiving the most probability.
+        Edges below ``threshold`` are pruned and only the ``max_edges``
+        heaviest are kept.
+        """
+        return self._cached(("view", max_nodes, max_edges, threshold),
+                            lambda: self._build_view(max_nodes, max_edges, threshold))
+
+    @profiled
+    def _build_view(self, max_nodes, max_edges, threshold):
+        chain = self.get_chain()
+        if chain.n_states <= max_nodes:
+            return self._state_view(chain, max_edges, threshold)
+        if chain.classify().n_classes > 1:
+            return self._class_view(chain, max_nodes, max_edges, threshold)
+        # one step from the uniform distribution, a cheap stand-in for stationary mass
+        matrix = chain.matrix
+        incoming = np.bincount(matrix.indices, weights=matrix.data, minlength=chain.n_states)
+        visible = np.sort(np.argsort(-incoming, kind="stable")[:max_nodes])
+        return self._state_view(chain, max_edges, threshold, visible=visible)
+
+    def _state_view(self, chain, max_edges, threshold, visible=None):
+        _, position = self._state_positions()
+        sources, targets = self.edge_columns()
+        rows, cols = position[sources], position[targets]
+        probabilities = self.edge_probabilities()
+        # edges whose label isn't a number are always drawn
+        weights = np.where(np.isnan(probabilities), np.inf, probabilities)
+        if visible is None:
+            visible = np.arange(chain.n_states)
+        else:
+            local = np.full(chain.n_states, -1)
+            local[visible] = np.arange(len(visible))
+            rows, cols = local[rows], local[cols]
+            weights = np.where((rows >= 0) & (cols >= 0), weights, -np.inf)
+        slots = select_edges(weights, threshold, max_edges)
+        positions = spring_layout(len(visible), rows[slots], cols[slots])
+        positions *= LAYOUT_SCALE * np.sqrt(len(visible))
+        nodes = []
+        for i, (x, y) in zip(visible.tolist(), positions.tolist()):
+            state = chain.states[i]
+            attributes = self._node_attributes.get(self._id_index[state]) or node_dict(state, label=state)
+            nodes.append({**attributes, "x": x, "y": y})
+        return GraphView(nodes=nodes, edges=[self.edge_dict(slot) for slot in slots.tolist()],
+                         hidden_nodes=chain.n_states - len(visible),
+                         hidden_edges=self.number_of_edges() - len(slots), positions=positions)
+
+    def _class_view(self, chain, max_nodes, max_edges, threshold):
+        classification = chain.classify()
+        group_of = classification.class_of
+        classes = list(classification.classes)
+        closed = list(classification.closed)
+        hidden_nodes = 0
+        if len(classes) > max_nodes:
+            # the biggest classes keep their own super-node, the rest share one
+            sizes = np.array([len(members) for members in classes])
+            largest = np.sort(np.argsort(-sizes, kind="stable")[:max_nodes - 1])
+            remap = np.full(len(classes), max_nodes - 1)
+            remap[largest] = np.arange(max_nodes - 1)
+            group_of = remap[group_of]
+            rest = np.setdiff1d(np.arange(len(classes)), largest)
+            hidden_nodes = len(rest)
+            classes = [classes[k] for k in largest] + [np.concatenate([classes[k] for k in rest])]
+            closed = [closed[k] for k in largest] + [False]
+        sizes = np.array([len(members) for members in classes], dtype="float64")
+
+        matrix = chain.matrix
+        rows, cols, weights = aggregate_edges(group_of, len(classes), matrix.rows, matrix.indices, matrix.data, sizes)
+        keep = select_edges(weights, threshold, max_edges)
+        positions = spring_layout(len(classes), rows[keep], cols[keep])
+        positions *= LAYOUT_SCALE * np.sqrt(len(classes))
+
+        ids = [f"C{k + 1}" for k in range(len(classes))]
+        nodes = []
+        for k, (members, (x, y)) in enumerate(zip(classes, positions.tolist())):
+            names = [chain.states[i] for i in members[:20]]
+            if hidden_nodes and k == len(classes) - 1:
+                label = f"{hidden_nodes} clases más"
+            elif len(members) == 1:
+                label = names[0]
             else:
-                st.error("La cadena no es ergódica")
+                label = f"{names[0]} +{len(members) - 1}"
+            nodes.append(node_dict(ids[k], title=", ".join(names) + (" …" if len(members) > 20 else ""),
+                                   label=label, shape="dot", size=25 + 5 * float(np.log2(len(members))),
+                                   color="#7BE141" if closed[k] else "#FB7E81", x=x, y=y))
+        edges = [edge_dict(ids[a], ids[b], label=f"{w:.2f}", color="#000000")
+                 for a, b, w in zip(rows[keep].tolist(), cols[keep].tolist(), weights[keep].tolist())]
+        return GraphView(nodes=nodes, edges=edges, collapsed=True, hidden_nodes=hidden_nodes,
+                         hidden_edges=len(weights) - len(keep), positions=positions)
+
+    def render_graph(self, config: dict = None, max_nodes=MAX_VISIBLE_NODES, max_edges=MAX_VISIBLE_EDGES,
+                     threshold=0.0):
+        from .rendering import render_graph
+        render_graph(self, config, view=self.get_view(max_nodes, max_edges, threshold))
+
+    def render_properties(self):
+        from .rendering import render_properties
+        render_properties(self)
 
-    @st.experimental_dialog("Calculo de Expresiones",width="large")
     def render_expression_calculation(self):
-        st.write("Calculo de Expresiones")
-        tdf = self.get_transition_matrix_df()
-        st.write("Matriz de Transición")
-        st.latex("T = "+ sp.latex(sp.Matrix(tdf.to_numpy())))
-        with st.expander("Ver Matriz con Indicadores"):
-            st.write(tdf)
-    
-        expr = st.text_area("Expresión",value="T**2")
-        symexp = sp.parse_expr(expr,transformations="all")
-        
-        if st.button("Calcular"):
-            result = symexp.subs("T",sp.Matrix(tdf.to_numpy()))
-            st.latex(sp.latex(symexp)+" = "+sp.latex(result))
-        
+        from .rendering import render_expression_calculation
+        render_expression_calculation(self)
+
+    def get_exact_transition_matrix(self):
+        """``T`` with exact rationals, or the generator ``Q`` of a continuous chain."""
+        return self._cached("exact_matrix", self._build_exact_transition_matrix)
+
+    @profiled
+    def _build_exact_transition_matrix(self):
+        from .expressions import exact_generator, exact_matrix
+        _, position = self._state_positions()
+        sources, targets = self.edge_columns()
+        rows, cols, labels = position[sources], position[targets], self.edge_labels()
+        if not self.is_continuous():
+            return exact_matrix(len(self.get_states()),rows,cols,labels)
+        # self loops mean nothing in continuous time, as in ContinuousChain.from_edges
+        keep = np.flatnonzero(rows != cols)
+        return exact_generator(len(self.get_states()),rows[keep],cols[keep],[labels[k] for k in keep])
+
+    def parse_expression(self, text):
+        from .expressions import parse_expression
+        return self._cached(("expression", text), lambda: parse_expression(text,len(self.get_states())))
+
+    @profiled
+    def evaluate_expression(self, text, exact=False):
+        from .expressions import compile_expression, evaluate_exact
+
+        # compiled functions and results are memoized on (text, graph version)
+        def build():
+            expr,T = self.parse_expression(text)
+            if exact:
+                return evaluate_exact(expr,T,self.get_exact_transition_matrix())
+            function = self._cached(("compiled", text), lambda: compile_expression(expr,T))
+            # a continuous chain binds T to its generator, the matrix the dialogs show
+            matrix = self.get_continuous_chain().dense_generator() if self.is_continuous() else self.get_integer_transition_matrix()
+            return function(np.array(matrix))
+        return self._cached(("expression_result", text, exact), build)
         
-    def is_regular_chain(self,limit=1000):
-        tdf = self.get_numpy_transition_matrix()
-        logs = []
-        for i in range(1,limit):
-            result = np.linalg.matrix_power(tdf,i)
-            
-            if  i > 1 and (result  == logs[-1]).all():
-                logs.append(result)
-                return True,logs
-            else:
-                logs.append(result)
-            
-            
-        return False,logs
+    @profiled
+    def classify(self):
+        return self.get_chain().classify()
+
+    @profiled
+    def stationary_distribution(self,method="auto",tol=1e-12,max_iter=100000):
+        return self.get_chain().stationary_distribution(method=method,tol=tol,max_iter=max_iter)
+
+    def _initial_distribution(self, initial):
+        # a state label, a {state: probability} mapping (or Series), or a full vector
+        chain = self.get_chain()
+        if hasattr(initial, "items"):
+            x0 = np.zeros(chain.n_states)
+            for state, probability in initial.items():
+                x0[chain.index[state]] = probability
+            return x0
+        if np.ndim(initial) == 0:
+            return chain.index[initial]
+        return np.asarray(initial, dtype="float64")
+
+    @profiled
+    def get_transition_power(self, n):
+        """``T^n`` as a DataFrame, by exponentiation by squaring (memoized per ``n``)."""
+        import pandas as pd
+        states = self.get_states()
+        return pd.DataFrame(self.get_chain().transition_power(n), index=states, columns=states, copy=True)
+
+    @profiled
+    def n_step_distribution(self, initial, horizons):
+        """``P(X_n = j)`` from ``initial``: a Series for one ``n``, a DataFrame (one row per ``n``) for many.
+
+        Every horizon comes from a single propagation of the initial vector,
+        one O(nnz) step at a time, so no matrix power is ever formed.
+        """
+        import pandas as pd
+        states = self.get_states()
+        distributions = self.get_chain().n_step(self._initial_distribution(initial), horizons)
+        if np.ndim(horizons) == 0:
+            return pd.Series(distributions[0], index=states)
+        return pd.DataFrame(distributions, index=pd.Index(horizons, name="n"), columns=states)
+
+    @profiled
+    def first_passage_distribution(self, initial, targets, horizon):
+        """``P(T = n)`` for ``n = 0..horizon``, ``T`` the first time ``n >= 1`` in ``targets``.
+
+        Starting inside ``targets`` this is the return-time distribution.
+        """
+        import pandas as pd
+        chain = self.get_chain()
+        f = chain.first_passage(self._initial_distribution(initial), [chain.index[state] for state in targets], horizon)
+        return pd.Series(f, index=pd.RangeIndex(horizon + 1, name="n"))
+
+    @profiled
+    def hitting_time_distribution(self, initial, targets, horizon):
+        """Like :meth:`first_passage_distribution` but counting ``n = 0`` when starting in ``targets``."""
+        import pandas as pd
+        chain = self.get_chain()
+        f = chain.first_passage(self._initial_distribution(initial), [chain.index[state] for state in targets], horizon,
+                                include_start=True)
+        return pd.Series(f, index=pd.RangeIndex(horizon + 1, name="n"))
+
+    @profiled
+    def expected_hitting_times(self, targets):
+        """Expected steps (time, in a continuous chain) to reach ``targets``; ``inf`` where it may never happen."""
+        import pandas as pd
+        chain = self.get_continuous_chain() if self.is_continuous() else self.get_chain()
+        return pd.Series(chain.expected_hitting_times([chain.index[state] for state in targets]), index=self.get_states())
+
+    @profiled
+    def transient_distribution(self, initial, times, method="auto"):
+        """``P(X_t = j)`` of a continuous chain: a Series for one ``t``, a DataFrame (one row per ``t``) for many.
+
+        ``method`` is ``"uniformization"``, ``"krylov"`` (``expm_multiply``)
+        or ``"auto"``; the times are integrated in one increasing pass.
+        """
+        import pandas as pd
+        states = self.get_states()
+        distributions = self.get_continuous_chain().transient(self._initial_distribution(initial), times, method=method)
+        if np.ndim(times) == 0:
+            return pd.Series(distributions[0], index=states)
+        return pd.DataFrame(distributions, index=pd.Index(times, name="t"), columns=states)
+
+    def mean_holding_times(self):
+        import pandas as pd
+        return pd.Series(self.get_continuous_chain().mean_holding_times(), index=self.get_states())
+
+    def is_regular_chain(self):
+        return self.classify().is_regular
         
     def is_ergodic_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values > 0)
+        return self.classify().is_ergodic
     
     def is_absorbing_chain(self):
-        tdf = self.get_transition_matrix_df()
-        for row in tdf.iterrows():
-            if sum(list(map(int,row[1].values))) == 1:
-                return True
-        return False
+        return self.classify().is_absorbing
 
     def is_irreducible_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values > 0)
+        return self.classify().is_irreducible
     
     def is_aperiodic_chain(self):
-        tdf = self.get_transition_matrix_df()
-        return np.all(tdf.sum(axis=1) == 1) and np.all(tdf.values > 0)
+        return self.classify().is_aperiodic
     
     def get_absorbing_states(self):
-        tdf = self.get_transition_matrix_df()
-        for row in tdf.iterrows():
-            if sum(list(map(int,row[1].values))) == 1:
-                tdf.drop(row[0],axis=0,inplace=True)
-
-        return tdf
-
-    def get_canonical_form(self):
-        #NOt working  yet :(
-        tdf = self.get_transition_matrix_df()
-        absorbing = self.get_absorbing_states()
-        if len(absorbing) > 0:
-            for row in absorbing.iterrows():
-                tdf.drop(row[0],axis=0,inplace=True)
-
-            tdf_non_absorbing = tdf
-            for row in absorbing.iterrows():
-                tdf_non_absorbing.drop(row[0],axis=0,inplace=True)
-            return tdf,np.eye(len(absorbing)),tdf_non_absorbing
-        else:
-            return tdf
-    def simulate(self,initial_state,steps):
-        tdf = self.get_transition_matrix_df()
-        states = []
-        current_state = initial_state
-        for _ in range(steps):
-            states.append(current_state)
-            current_state = np.random.choice(tdf.columns,p=tdf.loc[current_state])
-        return states
-
-    @st.experimental_dialog("Simulación de la Cadena de Markov",width="large")
-    def render_simulation(self):
-        st.write("Simulación de la Cadena de Markov")
-        tdf = self.get_transition_matrix_df()
-        st.write("Matriz de Transición")
-        st.latex("T = "+ sp.latex(sp.Matrix(tdf.to_numpy())))
-        with st.expander("Ver Matriz con Indicadores"):
-            st.write(tdf)
+        states = self.get_states()
+        return [states[i] for i in self.classify().absorbing_states]
+
+    @profiled
+    def get_absorbing_analysis(self):
+        return self.get_chain().absorbing()
 
-        initial_state = st.selectbox("Estado Inicial",list(tdf.columns))
-        steps = st.slider("Pasos",1,1000,10)
+    @profiled
+    def get_canonical_form(self, size=None):
+        """``[[Q, R], [0, I]]`` as DataFrames, or only its top-left ``size`` x ``size`` corner.
 
-        states = self.simulate(initial_state,steps)
-        st.write("Estados")
-        st.write(states)
+        The blocks are cut from the (sparse) absorbing analysis, so a corner
+        of a big chain never densifies the whole matrix.
+        """
+        import pandas as pd
+        analysis = self.get_absorbing_analysis()
+        states = self.get_states()
+        size = len(analysis.order) if size is None else min(size, len(analysis.order))
+        n_transient = min(size, len(analysis.transient))
+        n_absorbing = size - n_transient
 
-        st.write("Histograma de Estados")
-        fig = go.Figure()
-        fig.add_trace(go.Histogram(x=states))
-        st.plotly_chart(fig)
+        def dense(block):
+            return block.toarray() if hasattr(block, "toarray") else np.asarray(block)
 
+        canonical = np.block([[dense(analysis.Q[:n_transient, :n_transient]), dense(analysis.R[:n_transient, :n_absorbing])],
+                              [np.zeros((n_absorbing, n_transient)), np.eye(n_absorbing)]])
+        order = [states[i] for i in analysis.order[:size]]
+        transient,absorbing = order[:n_transient],order[n_transient:]
+        tdf = pd.DataFrame(canonical,index=order,columns=order)
+        return tdf,tdf.loc[transient,transient],tdf.loc[transient,absorbing]
+
+    def _transient_position(self, state):
+        analysis = self.get_absorbing_analysis()
+        index = self.get_state_index()
+        position = np.flatnonzero(analysis.transient == index[state])
+        if len(position) == 0:
+            raise ValueError(f"{state!r} is not a transient state")
+        return int(position[0])
+
+    @profiled
+    def expected_steps_to_absorption(self):
+        """Expected steps from each transient state, or expected time in a continuous chain."""
+        import pandas as pd
+        analysis = self.get_absorbing_analysis()
+        states = self.get_states()
+        steps = analysis.expected_steps()
+        if self.is_continuous():
+            steps = steps / self.get_continuous_chain().uniformization_rate
+        return pd.Series(steps,index=[states[i] for i in analysis.transient])
+
+    @profiled
+    def absorption_probabilities(self, start=None):
+        import pandas as pd
+        analysis = self.get_absorbing_analysis()
+        states = self.get_states()
+        absorbing = [states[i] for i in analysis.absorbing]
+        if start is not None:
+            return pd.Series(analysis.absorption_probabilities(self._transient_position(start)),index=absorbing)
+        transient = [states[i] for i in analysis.transient]
+        return pd.DataFrame(analysis.absorption_probabilities(),index=transient,columns=absorbing)
+
+    @profiled
+    def expected_visits(self, start):
+        import pandas as pd
+        analysis = self.get_absorbing_analysis()
+        states = self.get_states()
+        return pd.Series(analysis.expected_visits(self._transient_position(start)),
+                         index=[states[i] for i in analysis.transient])
+
+    @profiled
+    def simulate_batch(self,initial_state,steps,paths=1,seed=None,sampler="cumulative"):
+        chain = self.get_chain()
+        return chain.simulate(chain.index[initial_state],steps,paths=paths,seed=seed,sampler=sampler)
+
+    @profiled
+    def simulate(self,initial_state,steps,seed=None,sampler="cumulative"):
+        states = self.get_states()
+        path = self.simulate_batch(initial_state,steps,seed=seed,sampler=sampler)[0]
+        return [states[i] for i in path]
+
+    def simulate_stream(self,initial_state,steps,seed=None,sampler="cumulative",block_size=BLOCK_SIZE):
+        chain = self.get_chain()
+        return chain.stream(chain.index[initial_state],steps,seed=seed,sampler=sampler,block_size=block_size)
+
+    @profiled
+    def simulate_statistics(self,initial_state,steps,seed=None,sampler="cumulative",block_size=BLOCK_SIZE):
+        chain = self.get_chain()
+        return chain.statistics(chain.index[initial_state],steps,seed=seed,sampler=sampler,block_size=block_size)
+
+    @profiled
+    def monte_carlo(self,initial_state,steps,paths,seed=None,targets=None,workers=None,sampler="cumulative"):
+        chain = self.get_chain()
+        if targets is not None:
+            targets = [chain.index[state] for state in targets]
+        return chain.monte_carlo(chain.index[initial_state],steps,paths,
+                                 seed=seed,targets=targets,workers=workers,sampler=sampler)
+
+    def simulate_continuous(self,initial_state,horizon,paths=1,seed=None,times=None,sampler="cumulative"):
+        """Gillespie simulation of a continuous chain over ``[0, horizon]``, vectorized over ``paths``."""
+        chain = self.get_continuous_chain()
+        return chain.simulate(chain.index[initial_state],horizon,paths=paths,seed=seed,times=times,sampler=sampler)
+
+    def simulate_trajectory(self,initial_state,horizon,seed=None,sampler="cumulative"):
+        """Jump times and visited states of one continuous-time path."""
+        chain = self.get_continuous_chain()
+        times,path = chain.trajectory(chain.index[initial_state],horizon,seed=seed,sampler=sampler)
+        return times,[chain.states[i] for i in path]
+
+    def render_simulation(self):
+        from .rendering import render_simulation
+        render_simulation(self)
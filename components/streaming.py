@@ -0,0 +1,80 @@
+import numpy as np
+
+# states per yielded block; memory stays bounded by this, not by the run length
+BLOCK_SIZE = 1 << 16
+
+
+def iter_states(sampler, initial, steps, block_size=BLOCK_SIZE, rng=None):
+    """Yield a single path of ``steps`` states as ``int32`` blocks.
+
+    The first block starts with ``initial``, like :func:`simulate_paths`.
+    """
+    rng = np.random.default_rng(rng)
+    state = int(initial)
+    remaining = steps
+    first = True
+    while remaining > 0:
+        count = min(block_size, remaining)
+        if first:
+            block = np.empty(count, dtype=np.int32)
+            block[0] = state
+            block[1:] = sampler.walk(state, count - 1, rng)
+            first = False
+        else:
+            block = sampler.walk(state, count, rng)
+        state = int(block[-1])
+        remaining -= count
+        yield block
+
+
+class OnlineStatistics:
+    """Constant-memory accumulators fed with consecutive blocks of one path.
+
+    Transition counts are kept per support slot of the sampler (one counter
+    per possible transition), and ``tv_history`` records the total-variation
+    distance between the running empirical distribution and ``stationary``
+    after every block.
+    """
+
+    def __init__(self, sampler, stationary=None):
+        self.n_states = sampler.n_states
+        rows = np.repeat(np.arange(self.n_states, dtype=np.int64), np.diff(sampler.indptr))
+        self.pair_keys = rows * self.n_states + sampler.indices
+        self.pair_rows = rows
+        self.pair_cols = np.asarray(sampler.indices)
+        self.visits = np.zeros(self.n_states, dtype=np.int64)
+        self.transitions = np.zeros(len(self.pair_keys), dtype=np.int64)
+        self.stationary = None if stationary is None else np.asarray(stationary, dtype="float64")
+        self.tv_history = []
+        self.steps = 0
+        self._last = None
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.int64)
+        if len(block) == 0:
+            return
+        self.visits += np.bincount(block, minlength=self.n_states)
+        path = block if self._last is None else np.concatenate([[self._last], block])
+        if len(path) > 1:
+            slots = np.searchsorted(self.pair_keys, path[:-1] * self.n_states + path[1:])
+            self.transitions += np.bincount(slots, minlength=len(self.pair_keys))
+        self._last = int(block[-1])
+        self.steps += len(block)
+        if self.stationary is not None:
+            self.tv_history.append((self.steps, self.total_variation()))
+
+    @property
+    def empirical_distribution(self):
+        return self.visits / max(self.steps, 1)
+
+    def empirical_transition_matrix(self):
+        """Row-normalized transition counts as ``(rows, cols, probabilities)``."""
+        totals = np.bincount(self.pair_rows, weights=self.transitions, minlength=self.n_states)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            probabilities = np.where(totals[self.pair_rows] > 0, self.transitions / totals[self.pair_rows], 0.0)
+        return self.pair_rows, self.pair_cols, probabilities
+
+    def total_variation(self):
+        if self.stationary is None:
+            return float("nan")
+        return 0.5 * float(np.abs(self.empirical_distribution - self.stationary).sum())
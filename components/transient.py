@@ -0,0 +1,127 @@
+import numpy as np
+
+from .matrix import SparseTransitionMatrix, use_sparse, vecmat
+
+
+def _horizons(horizons):
+    horizons = np.atleast_1d(np.asarray(horizons, dtype=np.int64))
+    if len(horizons) and horizons.min() < 0:
+        raise ValueError("horizons must be non-negative")
+    return horizons
+
+
+def propagate(matrix, x0, horizons):
+    """Distributions ``x0 @ P^t`` for every ``t`` in ``horizons``, as rows.
+
+    One pass up to the largest horizon, one O(nnz) vector-matrix product
+    per step; ``x0`` can also be a ``(k, n)`` batch of distributions.
+    """
+    horizons = _horizons(horizons)
+    x = np.array(x0, dtype="float64")
+    out = np.empty((len(horizons),) + x.shape)
+    order = np.argsort(horizons, kind="stable")
+    t = 0
+    for i in order:
+        while t < horizons[i]:
+            x = vecmat(matrix, x)
+            t += 1
+        out[i] = x
+    return out
+
+
+def matrix_power(matrix, n):
+    """Dense ``P^n`` by repeated squaring, O(log n) products instead of n."""
+    if n < 0:
+        raise ValueError("n must be non-negative")
+    if isinstance(matrix, SparseTransitionMatrix):
+        matrix = matrix.to_dense()
+    return np.linalg.matrix_power(np.asarray(matrix, dtype="float64"), int(n))
+
+
+def first_passage(matrix, x0, targets, horizon, include_start=False):
+    """``f[t] = P(T = t)`` for ``t = 0..horizon`` where ``T`` is the first time in ``targets``.
+
+    ``T`` counts from ``t >= 1`` (first passage, or return time when the
+    chain starts in ``targets``) unless ``include_start`` makes it the
+    hitting time ``t >= 0``. Mass is propagated with the targets made
+    taboo, so each step is one O(nnz) vector-matrix product; the missing
+    mass ``1 - f.sum()`` is the probability of not arriving by ``horizon``.
+    """
+    mask = np.zeros(matrix.shape[0], dtype=bool)
+    mask[np.asarray(targets, dtype=np.int64)] = True
+    x = np.array(x0, dtype="float64")
+    f = np.zeros(horizon + 1)
+    if include_start:
+        f[0] = x[mask].sum()
+        x[mask] = 0.0
+    for t in range(1, horizon + 1):
+        x = vecmat(matrix, x)
+        f[t] = x[mask].sum()
+        x[mask] = 0.0
+    return f
+
+
+def expected_hitting_times(matrix, targets):
+    """Expected time to reach ``targets`` from every state (0 on the targets).
+
+    States that may never arrive get ``inf``. Everything else solves
+    ``(I - P_FF) k = 1`` on those states, which is non-singular because
+    from them the chain reaches ``targets`` with probability one.
+    """
+    if not isinstance(matrix, SparseTransitionMatrix):
+        matrix = SparseTransitionMatrix.from_dense(matrix)
+    n = matrix.n_states
+    targets = np.unique(np.asarray(targets, dtype=np.int64))
+    in_targets = np.zeros(n, dtype=bool)
+    in_targets[targets] = True
+
+    # stop the chain at the targets, then find who can escape them forever
+    stopped = matrix.replace_rows(targets, [([], [])] * len(targets))
+    keep = stopped.data > 0
+    backwards = SparseTransitionMatrix.from_coo(n, stopped.indices[keep], stopped.rows[keep], stopped.data[keep])
+    never = ~_reachable(backwards, targets)
+    risky = _reachable(backwards, np.flatnonzero(never)) if never.any() else never
+    finite = np.flatnonzero(~in_targets & ~risky)
+
+    times = np.full(n, np.inf)
+    times[targets] = 0.0
+    if len(finite) == 0:
+        return times
+    sub = matrix.submatrix(finite)
+    ones = np.ones(len(finite))
+    if use_sparse(len(finite), sub.nnz):
+        times[finite] = _sparse_solve(sub, ones)
+    else:
+        times[finite] = np.linalg.solve(np.eye(len(finite)) - sub.to_dense(), ones)
+    return times
+
+
+def _reachable(matrix, sources):
+    if not use_sparse(matrix.n_states, matrix.nnz):
+        return matrix.reachable(sources)
+    from scipy import sparse
+    from scipy.sparse import csgraph
+
+    # long paths make the level-by-level NumPy search slow: run one
+    # compiled search from an extra node that points at every source
+    n = matrix.n_states
+    sources = np.asarray(sources, dtype=np.int64)
+    rows = np.concatenate([matrix.rows, np.full(len(sources), n)])
+    cols = np.concatenate([matrix.indices, sources])
+    graph = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n + 1, n + 1))
+    seen = np.zeros(n + 1, dtype=bool)
+    seen[csgraph.breadth_first_order(graph, n, return_predecessors=False)] = True
+    return seen[:n]
+
+
+def _sparse_solve(sub, b, max_iter=200):
+    from scipy import sparse
+    from scipy.sparse import linalg
+
+    system = (sparse.identity(sub.n_states, format="csr") - sub.to_scipy()).tocsr()
+    # well-mixed chains converge in a few dozen iterations, with no fill-in;
+    # long, slowly mixing ones (birth-death) are banded, where LU is cheap
+    x, info = linalg.bicgstab(system, b, rtol=1e-12, maxiter=max_iter)
+    if info == 0:
+        return x
+    return linalg.splu(system.tocsc()).solve(b)